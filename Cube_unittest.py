@@ -19,11 +19,22 @@
 # Istituto di Fotonica e Nanotecnologie - Consiglio Nazionale delle Ricerche  #
 ###############################################################################
 
-from baseline import Translation as T, Corner, Edge, Sigma, Permutations as Perm
-from Rubik import RubiksCube, RubiksGroup
+from baseline import Translation as T, Exponential, Cubie, Corner, Edge, Sigma, Permutations as Perm, DensePermutation, \
+    set_orientation_mode, orientation_mode, ORIENTATION_MODES
+from Rubik import RubiksCube, RubiksGroup, CompactRubiksCube, BatchedRubiksCube, MOVES, SOLVED_STATE, EP, EO, CP, CO
+from coordinates import pack, unpack, state_key, key_state, state_keys, key_states, state_index, index_state, N_STATES, \
+    corner_permutation_coord, corner_twist_coord, edge_permutation_coord, edge_flip_coord, \
+    unrank_permutation, unrank_orientation, N_CORNER_PERMUTATIONS, N_EDGE_PERMUTATIONS
+from moves import parse, simplify, compile_sequence, OperatorCache, enable_cache, disable_cache
+from benchmark import measure, benchmarks, run, compare
+from profiling import Profiler, profile
+from symmetry import Symmetry, SYMMETRIES, SYMMETRY_MOVES, N_SYMMETRIES, conjugate, canonical
 import numpy as np
 import unittest
-from copy import copy
+from copy import copy, deepcopy
+import pickle
+import itertools
+import time
 
 
 
@@ -264,6 +275,41 @@ class TestPermutations(unittest.TestCase):
             Perm([1.5, 2, 4])
 
 
+## CLASS TO TEST DENSE PERMUTATIONS ##
+class TestDensePermutations(unittest.TestCase):
+    def setUp(self):
+        self.P = Perm([1,2,3,4], [2,1,4,3]).dense(6)
+        self.Q = Perm([0,2,5]).dense(6)
+
+    def test_conversion(self):
+        self.assertTrue(np.array_equal(self.P.image, [0,2,1,4,3,5]))
+        self.assertEqual(self.P.to_cycles(), Perm([1,2,3,4], [2,1,4,3]))
+        self.assertEqual(DensePermutation.identity(4).to_cycles(), Perm([0]))
+
+    ## the dense composition must act as the composition of the two-cycle notation ##
+    def test_composition(self):
+        v = np.arange(6)
+        v_ = copy(v)
+        self.assertTrue(np.array_equal((self.P @ self.Q) * v, self.P * (self.Q * v_)))
+        self.assertEqual((self.P @ self.Q).to_cycles(), Perm([1,2,3,4], [2,1,4,3]) @ Perm([0,2,5]))
+
+    def test_inverse(self):
+        self.assertEqual(self.Q @ self.Q.inverse(), DensePermutation.identity(6))
+        self.assertEqual(self.Q ** -1, self.Q.inverse())
+
+    def test_power(self):
+        self.assertEqual(self.Q ** 2, self.Q @ self.Q)
+        self.assertEqual(self.Q ** 3, DensePermutation.identity(6))
+        self.assertEqual(self.P ** 0, DensePermutation.identity(6))
+
+    def test_cycles(self):
+        self.assertEqual(self.P.cycles(), [[1,2], [3,4]])
+        self.assertEqual(self.Q.cycles(), [[0,2,5]])
+        self.assertEqual(self.P.order(), 2)
+        self.assertEqual((self.P @ self.Q).order(), 4)
+
+
+
 
                                         ##################
                                         ## RUBIK'S CUBE ##
@@ -487,6 +533,16 @@ class TestComposition(unittest.TestCase):
         self.Ket.reset()
         self.assertEqual(K1, K2)
 
+    ## the translations and orientations of cubies left in place by the ##
+    ## second operator must not be lost in the composition              ##
+    def test_fixedSlots(self):
+        U3 = self.U @ self.U @ self.U
+        K1 = copy((self.R @ (self.U @ U3)) * self.Ket)
+        self.Ket.reset()
+        K2 = copy(self.R * self.Ket)
+        self.Ket.reset()
+        self.assertEqual(K1, K2)
+
     def test_D3F4R(self):
         ## list of operators we are going to apply (from the right to the left) ##
         operators = [self.D, self.D, self.D, self.F, self.F, self.F, self.F, self.R]
@@ -501,6 +557,44 @@ class TestComposition(unittest.TestCase):
         self.assertEqual(K1, K2)
 
 
+## class test for inverse and powers of the operators ##
+class TestPowers(unittest.TestCase):
+    def setUp(self):
+        self.Ket = RubiksCube()
+        self.RU = RubiksGroup.R() @ RubiksGroup.U()
+
+    def test_inverse(self):
+        self.RU * self.Ket
+        self.RU.inverse() * self.Ket
+        self.assertTrue(self.Ket.is_solved())
+
+    def test_power(self):
+        K1 = copy((self.RU ** 3) * self.Ket)
+        self.Ket.reset()
+        for _ in range(3): self.RU * self.Ket
+        self.assertEqual(K1, self.Ket)
+
+    ## RU has order 105 ##
+    def test_period(self):
+        (self.RU ** 105) * self.Ket
+        self.assertTrue(self.Ket.is_solved())
+        (self.RU ** -104) * self.Ket
+        self.assertEqual(self.Ket, self.RU * RubiksCube())
+
+    ## powers are memoized on the operator ##
+    def test_cache(self):
+        self.assertIs(self.RU ** -1, self.RU.inverse())
+        self.assertIs(self.RU ** 2, self.RU ** 2)
+        self.assertIs(self.RU.inverse().inverse(), self.RU)
+        self.assertIs(RubiksGroup.move("F'"), RubiksGroup.move('F') ** -1)
+
+    def test_identity(self):
+        (self.RU ** 0) * self.Ket
+        self.assertTrue(self.Ket.is_solved())
+        RubiksGroup.identity() * self.Ket
+        self.assertTrue(self.Ket.is_solved())
+
+
 
 
 ## class test for the periodicity of composed operators ##
@@ -556,6 +650,591 @@ class TestPeriodicComposition(unittest.TestCase):
 
 
 
+                                        ##################
+                                        ## COMPACT CUBE ##
+                                        ##################
+
+## class test to check the compact Cube against the Cube made of Edge/Corner objects ##
+class TestCompactCube(unittest.TestCase):
+    def setUp(self):
+        self.C = RubiksCube()
+        self.K = CompactRubiksCube()
+        self.generators = [RubiksGroup.U(), RubiksGroup.D(), RubiksGroup.L(),
+                           RubiksGroup.R(), RubiksGroup.F(), RubiksGroup.B()]
+
+    def test_isSolved(self):
+        self.assertTrue(self.K.is_solved())
+        RubiksGroup.F() * self.K
+        self.assertFalse(self.K.is_solved())
+        self.K.reset()
+        self.assertTrue(self.K.is_solved())
+
+    def test_size(self):
+        self.assertEqual(self.K.state.nbytes, 40)
+
+    ## every generator must act on both representations in the same way ##
+    def test_generators(self):
+        for O in self.generators:
+            O * self.C
+            O * self.K
+            self.assertEqual(self.K, self.C.compact())
+            self.assertEqual(self.K.to_cube(), self.C)
+
+    def test_periodicity(self):
+        for O in self.generators:
+            for _ in range(4): O * self.K
+            self.assertTrue(self.K.is_solved())
+
+    def test_composition(self):
+        operators = [self.generators[0], self.generators[4], self.generators[4], self.generators[3], self.generators[1]]
+        UF2RD = RubiksGroup.compose_multipleOperators(operators)
+        UF2RD * self.K
+        K1 = copy(self.K)
+        self.K.reset()
+        for O in reversed(operators): O * self.K
+        self.assertEqual(K1, self.K)
+
+    def test_wrongShape(self):
+        with self.assertRaises(TypeError):
+            CompactRubiksCube(np.zeros(20))
+
+
+## class test for the precompiled tables of the face turns ##
+class TestMoveTables(unittest.TestCase):
+    def setUp(self):
+        self.K = CompactRubiksCube()
+
+    def test_shapes(self):
+        src, delta = RubiksGroup.move_tables()
+        self.assertEqual(src.shape, (18, 40))
+        self.assertEqual(delta.shape, (18, 40))
+        self.assertEqual(len(RubiksGroup.moves()), len(MOVES))
+
+    ## X followed by X' must restore the solved state ##
+    def test_inverse(self):
+        for face in 'UDLRFB':
+            RubiksGroup.move(face) * self.K
+            RubiksGroup.move(face + "'") * self.K
+            self.assertTrue(self.K.is_solved())
+
+    def test_halfTurn(self):
+        for face in 'UDLRFB':
+            K1 = RubiksGroup.move(face + '2') * CompactRubiksCube()
+            for _ in range(2): RubiksGroup.move(face) * self.K
+            self.assertEqual(K1, self.K)
+            self.K.reset()
+
+    ## the composition of the tables must match the composition of the operators ##
+    def test_composedTables(self):
+        RU = RubiksGroup.move('R') @ RubiksGroup.move("U'")
+        RU_ = RubiksGroup.R() @ RubiksGroup.compose_multipleOperators([RubiksGroup.U()] * 3)
+        for t1, t2 in zip(RU.compile(), RU_.compile()):
+            self.assertTrue(np.array_equal(t1, t2))
+
+    def test_wrongMove(self):
+        with self.assertRaises(TypeError):
+            RubiksGroup.move('X')
+
+
+## class test for the batched Cube ##
+class TestBatchedCube(unittest.TestCase):
+    def setUp(self):
+        self.B = BatchedRubiksCube(6)
+
+    def test_isSolved(self):
+        self.assertTrue(self.B.is_solved().all())
+        self.B.step([0, 3, 6, 9, 12, 15])
+        self.assertFalse(self.B.is_solved().any())
+        self.B.reset(np.array([True, False, True, False, False, False]))
+        self.assertTrue(np.array_equal(self.B.is_solved(), [True, False, True, False, False, False]))
+        self.B.reset()
+        self.assertTrue(self.B.is_solved().all())
+
+    ## every Cube of the batch must evolve as a single compact Cube ##
+    def test_step(self):
+        rng = np.random.default_rng(0)
+        cubes = [CompactRubiksCube() for _ in range(len(self.B))]
+        for _ in range(10):
+            actions = rng.integers(len(MOVES), size=len(self.B))
+            self.B.step(actions)
+            for K, a in zip(cubes, actions): RubiksGroup.move(MOVES[a]) * K
+        for i, K in enumerate(cubes):
+            self.assertEqual(self.B[i], K)
+        self.assertEqual(BatchedRubiksCube.from_cubes(cubes), self.B)
+
+    ## an operator acts on all the Cubes of the batch ##
+    def test_operator(self):
+        RubiksGroup.R() * self.B
+        K = RubiksGroup.R() * CompactRubiksCube()
+        for i in range(len(self.B)):
+            self.assertEqual(self.B[i], K)
+
+    ## the successors must match the object operators applied to every Cube ##
+    def test_successors(self):
+        self.B.scramble(8, np.random.default_rng(1))
+        self.B.reset(np.array([False, True, False, False, False, False]))
+        out = np.empty((len(self.B), len(MOVES), 40), dtype=np.uint8)
+        successors, solved = self.B.successors(out=out)
+        self.assertIs(successors, out)
+        for i in range(len(self.B)):
+            for m, name in enumerate(MOVES):
+                K = RubiksGroup.move(name) * self.B[i].to_cube()
+                self.assertEqual(CompactRubiksCube(successors[i, m]), K.compact())
+                self.assertEqual(solved[i, m], K.is_solved())
+        self.assertFalse(solved[1].any())
+        ## a solved state is a successor of its neighbours ##
+        successors, solved = RubiksGroup.successors(RubiksGroup.successors(self.B)[0][1], RubiksGroup.action_tables(["U'"]))
+        self.assertTrue(np.array_equal(solved[:, 0], [name == 'U' for name in MOVES]))
+        with self.assertRaises(TypeError):
+            RubiksGroup.successors(np.zeros((3, 20)))
+        with self.assertRaises(TypeError):
+            self.B.successors(out=np.empty((len(self.B), 12, 40), dtype=np.uint8))
+
+
+## class test for the compact keys and the coordinates of the states ##
+class TestCoordinates(unittest.TestCase):
+    def setUp(self):
+        self.B = BatchedRubiksCube(50).scramble(25, np.random.default_rng(0))
+
+    def test_hash(self):
+        K1 = RubiksGroup.R() * CompactRubiksCube()
+        K2 = RubiksGroup.R() * CompactRubiksCube()
+        self.assertEqual(len({K1, K2, CompactRubiksCube()}), 2)
+        self.assertEqual(hash(RubiksGroup.R() * RubiksCube()), hash(K1))
+
+    def test_keys(self):
+        self.assertTrue(np.array_equal(unpack(pack(self.B.state)), self.B.state))
+        for state in self.B.state:
+            self.assertTrue(np.array_equal(key_state(state_key(state)), state))
+        self.assertEqual(len({state_key(s) for s in self.B.state}), len(np.unique(self.B.state, axis=0)))
+        ## batched keys ##
+        keys = state_keys(self.B.state)
+        self.assertEqual(keys, [state_key(s) for s in self.B.state])
+        self.assertTrue(np.array_equal(key_states(keys), self.B.state))
+        self.assertEqual(key_states([]).shape, (0, 40))
+
+    def test_solved(self):
+        self.assertEqual(state_index(SOLVED_STATE), 0)
+        self.assertEqual(corner_twist_coord(SOLVED_STATE), 0)
+        self.assertTrue(np.array_equal(index_state(0), SOLVED_STATE))
+
+    def test_ranks(self):
+        for rank, coord, n, N in [(corner_permutation_coord, CP, 8, N_CORNER_PERMUTATIONS),
+                                  (edge_permutation_coord, EP, 12, N_EDGE_PERMUTATIONS)]:
+            ranks = rank(self.B.state)
+            self.assertTrue((ranks < N).all())
+            self.assertTrue(np.array_equal(unrank_permutation(ranks, n), self.B.state[:, coord]))
+        self.assertTrue(np.array_equal(unrank_orientation(corner_twist_coord(self.B.state), 8, 3), self.B.state[:, CO]))
+        self.assertTrue(np.array_equal(unrank_orientation(edge_flip_coord(self.B.state), 12, 2), self.B.state[:, EO]))
+
+    ## the perfect index is a bijection on reachable states ##
+    def test_index(self):
+        for state in self.B.state:
+            index = state_index(state)
+            self.assertTrue(0 <= index < N_STATES)
+            self.assertTrue(np.array_equal(index_state(index), state))
+
+
+## class test for the 48 symmetries of the cube ##
+class TestSymmetry(unittest.TestCase):
+    def setUp(self):
+        self.B = BatchedRubiksCube(20).scramble(25, np.random.default_rng(0))
+
+    def test_group(self):
+        self.assertEqual(len({S.matrix.tobytes() for S in Symmetry.all()}), N_SYMMETRIES)
+        self.assertEqual(sum(S.is_reflection() for S in Symmetry.all()), 24)
+        for S in Symmetry.all():
+            self.assertEqual(S @ S.inverse(), Symmetry())
+            self.assertTrue(np.array_equal(conjugate(SOLVED_STATE, S.index), SOLVED_STATE))
+
+    ## S * (m * state) == S(m) * (S * state), for every symmetry and move ##
+    def test_moves(self):
+        for S in Symmetry.all():
+            for m in MOVES:
+                K = S * (RubiksGroup.move(m) * CompactRubiksCube(self.B.state[0]))
+                self.assertEqual(K, RubiksGroup.move(S.move(m)) * (S * CompactRubiksCube(self.B.state[0])))
+        self.assertEqual(len({tuple(row) for row in SYMMETRY_MOVES}), N_SYMMETRIES)
+
+    ## a reflection turns a clockwise turn into an anticlockwise one ##
+    def test_reflection(self):
+        S = Symmetry([i for i, m in enumerate(SYMMETRIES) if np.array_equal(m, np.diag([-1, 1, 1]))][0])
+        self.assertEqual(S.move('R'), "L'")
+        self.assertEqual(S.move('U2'), 'U2')
+        K = S.conjugate(RubiksGroup.R()) * (RubiksGroup.U() * RubiksCube())
+        self.assertEqual(K.compact(), RubiksGroup.move("L'") * (RubiksGroup.U() * CompactRubiksCube()))
+
+    def test_canonical(self):
+        reference, _ = canonical(self.B.state)
+        for S in Symmetry.all():
+            states, symmetries = canonical((S * self.B).state)
+            self.assertTrue(np.array_equal(states, reference))
+            for state, s, original in zip(states, symmetries, (S * self.B).state):
+                self.assertTrue(np.array_equal(conjugate(original, s), state))
+
+
+## class test for the parsing, simplification and compiling of move sequences ##
+class TestSequences(unittest.TestCase):
+    def test_parse(self):
+        self.assertEqual(parse("R U R' U' R2"), ['R', 'U', "R'", "U'", 'R2'])
+        self.assertEqual(parse("RUR'U'R2'"), ['R', 'U', "R'", "U'", 'R2'])
+        self.assertEqual(parse(['F', "B'"]), ['F', "B'"])
+        with self.assertRaises(TypeError):
+            parse("R X")
+        with self.assertRaises(TypeError):
+            parse(['R', 'R3'])
+
+    def test_simplify(self):
+        self.assertEqual(simplify("R R"), ['R2'])
+        self.assertEqual(simplify("R U U' R'"), [])
+        self.assertEqual(simplify("U D U'"), ['D'])
+        self.assertEqual(simplify("R L R"), ['L', 'R2'])
+        self.assertEqual(simplify("B F2 R"), ['F2', 'B', 'R'])
+        self.assertEqual(simplify("R U R' U'"), ['R', 'U', "R'", "U'"])
+
+    ## the simplified sequence acts as the original one ##
+    def test_equivalence(self):
+        rng = np.random.default_rng(0)
+        for _ in range(50):
+            sequence = [MOVES[m] for m in rng.integers(len(MOVES), size=12)]
+            K1, K2 = CompactRubiksCube(), CompactRubiksCube()
+            for name in sequence: K1 = RubiksGroup.move(name) * K1
+            for name in simplify(sequence): K2 = RubiksGroup.move(name) * K2
+            self.assertEqual(K1, K2)
+            self.assertLessEqual(len(simplify(sequence)), len(sequence))
+            self.assertEqual(simplify(simplify(sequence)), simplify(sequence))
+
+    ## the sequence is applied left to right ##
+    def test_compile(self):
+        O = compile_sequence("R U R' U' R R")
+        K = CompactRubiksCube()
+        for name in ['R', 'U', "R'", "U'", 'R2']: K = RubiksGroup.move(name) * K
+        self.assertEqual(O * CompactRubiksCube(), K)
+        self.assertEqual((O * RubiksCube()).compact(), K)
+        self.assertTrue(compile_sequence("U U'") * RubiksCube() == RubiksCube())
+
+
+## class test for the LRU cache of composed operators ##
+class TestOperatorCache(unittest.TestCase):
+    def tearDown(self):
+        disable_cache()
+
+    ## equivalent sequences share the same entry ##
+    def test_hits(self):
+        cache = OperatorCache()
+        O = compile_sequence("R U R' U'", cache=cache)
+        self.assertIs(compile_sequence("R U R' D D' U'", cache=cache), O)
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(cache.stats()['misses'], 1)
+        self.assertEqual(O * CompactRubiksCube(), compile_sequence("R U R' U'") * CompactRubiksCube())
+
+    def test_eviction(self):
+        cache = OperatorCache(maxsize=2)
+        for sequence in ["R", "U", "R", "F"]:
+            compile_sequence(sequence, cache=cache)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.evictions, 1)
+        ## U was the least recently used ##
+        self.assertIn("R", cache)
+        self.assertNotIn("U", cache)
+        with self.assertRaises(TypeError):
+            OperatorCache(maxsize=0)
+
+    def test_default(self):
+        cache = enable_cache(16)
+        compile_sequence("F R U")
+        compile_sequence("F R U")
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        disable_cache()
+        compile_sequence("F R U")
+        self.assertEqual(cache.hits + cache.misses, 2)
+
+
+## class test for the macro-operators ##
+class TestMacros(unittest.TestCase):
+    ## the registry is shared by the process: leave it as it was found ##
+    def tearDown(self):
+        for name in ['sexy', 'RR']:
+            if name in RubiksGroup.macros(): RubiksGroup.unregister_macro(name)
+
+    def test_register(self):
+        O = RubiksGroup.register_macro('sexy', "R U R' U'")
+        self.assertIs(RubiksGroup.macro('sexy'), O)
+        self.assertIs(RubiksGroup.action('sexy'), O)
+        self.assertIs(RubiksGroup.action('R'), RubiksGroup.move('R'))
+        self.assertEqual(O * RubiksCube(), compile_sequence("R U R' U'") * RubiksCube())
+        self.assertEqual(RubiksGroup.register_macro('RR', RubiksGroup.move('R2')).compile()[0].tolist(),
+                         RubiksGroup.move('R2').compile()[0].tolist())
+        with self.assertRaises(TypeError):
+            RubiksGroup.register_macro('R', "U")
+        with self.assertRaises(TypeError):
+            RubiksGroup.macro('missing')
+
+    ## macros and face turns mixed in a single batched step ##
+    def test_batched(self):
+        RubiksGroup.register_macro('sexy', ['R', 'U', "R'", "U'"])
+        tables = RubiksGroup.action_tables(['U', 'sexy'])
+        B = BatchedRubiksCube(3).step([1, 0, 1], tables)
+        self.assertEqual(B[0], RubiksGroup.macro('sexy') * CompactRubiksCube())
+        self.assertEqual(B[1], RubiksGroup.U() * CompactRubiksCube())
+        self.assertEqual(B[2], B[0])
+
+    ## a name is rebound only on request, and the same operator is accepted again ##
+    def test_overwrite(self):
+        O = RubiksGroup.register_macro('sexy', "R U R' U'")
+        self.assertIs(RubiksGroup.register_macro('sexy', ['R', 'U', "R'", "U'"]), O)
+        with self.assertRaises(TypeError):
+            RubiksGroup.register_macro('sexy', "R U")
+        self.assertIs(RubiksGroup.macro('sexy'), O)
+        P = RubiksGroup.register_macro('sexy', "R U", overwrite=True)
+        self.assertIs(RubiksGroup.macro('sexy'), P)
+        self.assertIs(RubiksGroup.unregister_macro('sexy'), P)
+        self.assertNotIn('sexy', RubiksGroup.macros())
+        with self.assertRaises(TypeError):
+            RubiksGroup.unregister_macro('sexy')
+
+
+## class test for the benchmark helpers ##
+class TestBenchmark(unittest.TestCase):
+    def test_measure(self):
+        stats = measure(lambda: None, number=5, repeat=4, warmup=1, ops=3)
+        self.assertEqual(stats['calls'], 20)
+        self.assertLessEqual(stats['min'], stats['p50'])
+        self.assertLessEqual(stats['p50'], stats['p99'])
+        self.assertAlmostEqual(stats['ops_per_sec'], 3 / stats['mean'])
+
+    ## the percentiles are per call: one slow call in ten shows in p99 only ##
+    def test_percentiles(self):
+        calls = itertools.count()
+        stats = measure(lambda: next(calls) % 10 == 9 and time.sleep(0.002), number=10, repeat=10, warmup=0)
+        self.assertGreater(stats['p99'], 0.002)
+        self.assertLess(stats['p50'], 0.001)
+
+    ## every case has its own operands ##
+    def test_fixtures(self):
+        cases = benchmarks(batch_sizes=())
+        for _ in range(3): cases['mul_object'][0]()
+        self.assertTrue(cases['is_solved'][0]())
+        self.assertFalse(cases['eq'][0]())
+
+    def test_report(self):
+        report = run(['reset', 'env_step_1'], quick=True)
+        self.assertIn('reset', report['results'])
+        self.assertNotIn('matmul', report['results'])
+        self.assertEqual(compare(report, report), {name: 1. for name in report['results']})
+
+
+## class test for the profiling hooks ##
+class TestProfiler(unittest.TestCase):
+    def test_counts(self):
+        R, U = RubiksGroup.move('R'), RubiksGroup.move('U')
+        with Profiler() as profiler:
+            for _ in range(3): R * RubiksCube()
+            R @ U
+        self.assertEqual(profiler.stats['RubiksGroup.__mul__']['calls'], 3)
+        self.assertEqual(profiler.stats['RubiksGroup.__matmul__']['calls'], 1)
+        self.assertGreater(profiler.stats['RubiksGroup.__mul__']['time'], 0)
+        self.assertIn('RubiksGroup.__mul__', profiler.report())
+
+    ## the constructors are timed and counted in both orientation modes ##
+    def test_constructors(self):
+        R = RubiksGroup.move('R')
+        for mode in ORIENTATION_MODES:
+            set_orientation_mode(mode)
+            try:
+                K = RubiksCube()
+                with Profiler() as profiler:
+                    for _ in range(20): R * K
+            finally:
+                set_orientation_mode('vector')
+            stats = [profiler.stats[name] for name in ('Edge.__new__', 'Corner.__new__', 'baseline._interned')]
+            ## every R turn translates, then rotates, 4 edges and 4 corners ##
+            self.assertEqual(sum(s['cubies'] for s in stats), 320)
+            self.assertEqual(profiler.stats['RubiksGroup.__mul__']['cubies'], 320)
+            self.assertEqual(sum(s['calls'] for s in stats), 320)
+            self.assertGreater(sum(s['time'] for s in stats), 320 * 1e-7)
+        ## in the integer mode the operators move the flyweights only ##
+        self.assertEqual(stats[2]['cubies'], 320)
+        self.assertEqual(stats[0]['calls'] + stats[1]['calls'], 0)
+
+    ## the original methods are restored on exit ##
+    def test_disabled(self):
+        methods = RubiksGroup.__mul__, Edge.__new__, Perm.__matmul__
+        _, profiler = profile(lambda: Perm([0, 1]) @ Perm([1, 2]), targets=['Permutations.__matmul__'])
+        self.assertEqual([*profiler.stats], ['Permutations.__matmul__'])
+        self.assertEqual(profiler.stats['Permutations.__matmul__']['calls'], 1)
+        self.assertEqual((RubiksGroup.__mul__, Edge.__new__, Perm.__matmul__), methods)
+        self.assertFalse(profiler.enabled)
+
+    def test_errors(self):
+        with self.assertRaises(TypeError):
+            Profiler(['RubiksCube.reset'])
+        with Profiler():
+            with self.assertRaises(TypeError):
+                Profiler().enable()
+
+    def test_memory(self):
+        with Profiler(['RubiksGroup.__mul__'], memory=True) as profiler:
+            RubiksGroup.move('R') * RubiksCube()
+        self.assertIn('bytes', profiler.report())
+
+
+## class test for the in-place apply() and undo() ##
+class TestMakeUnmake(unittest.TestCase):
+    ## undo() restores the very same cubie objects ##
+    def test_object(self):
+        C = RubiksCube()
+        history, rng = [], np.random.default_rng(0)
+        for m in rng.integers(len(MOVES), size=100):
+            history.append(copy(C.Cube))
+            C.apply(MOVES[m])
+        self.assertEqual(C.depth, 100)
+        self.assertEqual(C, RubiksCube(copy(history[-1])).apply(MOVES[m]))
+        while history:
+            C.undo()
+            self.assertTrue(all(c1 is c2 for c1, c2 in zip(C.Cube, history.pop())))
+        self.assertTrue(C.is_solved())
+        with self.assertRaises(IndexError):
+            C.undo()
+
+    def test_compact(self):
+        state = SOLVED_STATE.copy()
+        K = CompactRubiksCube(state)
+        O = RubiksGroup.move('R') @ RubiksGroup.move('F')
+        K.apply(O).apply("U'")
+        self.assertEqual(K, RubiksGroup.move("U'") * (O * CompactRubiksCube()))
+        self.assertTrue(np.array_equal(state, SOLVED_STATE))
+        self.assertEqual(K.undo(), O * CompactRubiksCube())
+        self.assertTrue(K.undo().is_solved())
+
+    ## the object and compact Cubes stay in step ##
+    def test_consistency(self):
+        C, K = RubiksCube(), CompactRubiksCube()
+        for name in ['R', 'U2', "F'", 'L', 'D', "B'", 'R2']:
+            C.apply(name)
+            K.apply(name)
+        C.undo()
+        K.undo()
+        self.assertEqual(C.compact(), K)
+        C.reset()
+        self.assertEqual(C.depth, 0)
+
+    ## copies are independent snapshots, with an empty undo stack ##
+    def test_copy(self):
+        for K in (RubiksCube(), CompactRubiksCube()):
+            K.apply('R')
+            K2 = copy(K)
+            K.apply('U')
+            self.assertEqual(K2, RubiksGroup.move('R') * type(K)())
+            self.assertEqual(K2.depth, 0)
+            K2.apply("R'")
+            self.assertTrue(K2.is_solved())
+            self.assertEqual(K.undo(), K2.apply('R'))
+
+
+## class test for the integer orientation mode ##
+class TestIntegerOrientation(unittest.TestCase):
+    def setUp(self):
+        set_orientation_mode('integer')
+
+    def tearDown(self):
+        set_orientation_mode('vector')
+
+    def test_codes(self):
+        self.assertEqual(orientation_mode(), 'integer')
+        C = Corner(1, 2, 3)
+        self.assertEqual((Sigma.C() * C).code, 1)
+        self.assertEqual((Sigma.A() * C).code, 2)
+        self.assertTrue(np.array_equal((Sigma.A() * C).orientation, [1., 0., 0.]))
+        self.assertEqual((Sigma.X() * (Sigma.X() * Edge())).code, 0)
+        ## a non-cyclic matrix goes through the vector product ##
+        self.assertEqual((Sigma(np.array([[0., 1., 0.], [1., 0., 0.], [0., 0., 1.]])) * C).code, 2)
+        with self.assertRaises(TypeError):
+            Corner(vector=np.array([1, 1, 0]))
+        with self.assertRaises(TypeError):
+            set_orientation_mode('float')
+
+    ## cubies of the two modes can be mixed ##
+    def test_interoperability(self):
+        C = Sigma.C() * Corner(0, 1, 0)
+        set_orientation_mode('vector')
+        V = Sigma.C() * Corner(0, 1, 0)
+        self.assertTrue(V.orientation.flags.writeable)
+        self.assertEqual(C, V)
+        self.assertEqual(T(1, 0, 0) @ C, T(1, 0, 0) @ V)
+
+    ## edges and corners with equal positions and codes are different cubies ##
+    def test_cubie_types(self):
+        I = Edge()
+        set_orientation_mode('vector')
+        self.assertNotEqual(Edge(), Corner())
+        self.assertNotEqual(I, Corner())
+        self.assertNotEqual(Corner(), I)
+        ## generic cubies keep no orientation ##
+        self.assertEqual(repr(Cubie()), '(0, 0, 0, None)')
+        self.assertEqual(Cubie(), Cubie())
+        self.assertEqual(Cubie() * T(1), T(1) @ Cubie())
+        self.assertEqual((Cubie() * T(1)).x, 1)
+
+    def test_moves(self):
+        K = RubiksGroup.move('R') * (RubiksGroup.move("F'") * RubiksCube())
+        set_orientation_mode('vector')
+        self.assertEqual(K, RubiksGroup.move('R') * (RubiksGroup.move("F'") * RubiksCube()))
+        self.assertEqual(K.compact(), RubiksGroup.move('R') * (RubiksGroup.move("F'") * CompactRubiksCube()))
+
+
+## class test for the flyweight cubies ##
+class TestFlyweight(unittest.TestCase):
+    def setUp(self):
+        set_orientation_mode('integer')
+
+    def tearDown(self):
+        set_orientation_mode('vector')
+
+    def test_interning(self):
+        self.assertIs(Corner(1, 1, 1), Corner(1, 1, 1))
+        self.assertIs(Sigma.C() * Corner(), Corner(vector=np.array([0., 0., 1.])))
+        self.assertIs(T(1, 0, 0) @ Edge(), Edge(1, 0, 0))
+        self.assertIs(Edge(1, 0, 0) * T(-1, 0, 0), Edge())
+        self.assertIsNot(Edge(), Corner())
+        self.assertNotEqual(Edge(), Edge(vector=np.array([0., 1.])))
+
+    def test_immutable(self):
+        E = Edge(1, 0, 0)
+        with self.assertRaises(AttributeError):
+            E.x = 2
+        self.assertIs(copy(E), E)
+        self.assertIs(deepcopy(E), E)
+        self.assertIs(pickle.loads(pickle.dumps(E)), E)
+        set_orientation_mode('vector')
+        V = Corner(0, 1, 0)
+        self.assertEqual(pickle.loads(pickle.dumps(V)), V)
+        ## generic cubies take the vector first ##
+        G = pickle.loads(pickle.dumps(Cubie(np.array([1., 0.]), 1, 2, 3)))
+        self.assertEqual((G.x, G.y, G.z), (1, 2, 3))
+        self.assertTrue(np.array_equal(G.orientation, [1., 0.]))
+
+    ## the object API of the vector mode is kept: mutable cubies, compared as exponentials ##
+    def test_vector_mode(self):
+        set_orientation_mode('vector')
+        E = Edge()
+        self.assertTrue(T() == E)
+        self.assertTrue(isinstance(E, Exponential))
+        E.x = 3
+        self.assertEqual(E, Edge(3))
+        self.assertIsNot(copy(E), E)
+        self.assertEqual(deepcopy(E), E)
+
+    def test_solved(self):
+        K = RubiksCube()
+        self.assertTrue(K.is_solved())
+        self.assertTrue(all(c1 is c2 for c1, c2 in zip(K.Cube, K.solved)))
+        K = RubiksGroup.move('U') * K
+        self.assertFalse(K.is_solved())
+        self.assertTrue((RubiksGroup.move("U'") * K).is_solved())
+
+
+
+
 
 
 
@@ -0,0 +1,114 @@
+###############################################################################
+# The copyright of this code, including all portions, content, design, text,  #
+# output and the selection and arrangement of the subroutines is owned by     #
+# the Authors and by CNR, unless otherwise indicated, and is protected by the #
+# provisions of the Italian Copyright law.                                    #
+#                                                                             #
+# All rights reserved. This software may not be reproduced or distributed, in #
+# whole or in part, without the prior written permission of the Authors.      #
+# However, reproduction and distribution, in whole or in part, by non-profit, #
+# research or educational institutions for their own use is permitted if      #
+# proper credit is given, with full citation, and copyright is acknowledged.  #
+# Any other reproduction or distribution, in whatever form and by whatever    #
+# media, is expressly prohibited without the prior written consent of the     #
+# Authors. For further information, please contact CNR.                       #
+# Contact person:           enrico.prati@cnr.it                               #
+#                                                                             #
+# Concept and development:  Sebastiano Corli, Lorenzo Moro, Enrico Prati      #
+# Year:                     2022                                              #
+# Istituto di Fotonica e Nanotecnologie - Consiglio Nazionale delle Ricerche  #
+###############################################################################
+
+from Rubik import MOVES, SOLVED_STATE
+from dataset import random_walks, generate, write_dataset, ShardWriter, ShardReader, record_dtype
+from solver import apply_moves, ALLOWED
+import numpy as np
+import unittest
+import tempfile
+import json
+import os
+
+
+
+## class test for the scramble generator and the shard writer ##
+class TestGenerator(unittest.TestCase):
+    ## every record is one move away from the previous one of its walk ##
+    def test_walks(self):
+        previous = np.tile(SOLVED_STATE, (10, 1))
+        last = np.full(10, len(MOVES))
+        for depth, records in enumerate(random_walks(10, 8, rng=0), 1):
+            self.assertTrue((records['depth'] == depth).all())
+            self.assertTrue(ALLOWED[last, records['last_move']].all())
+            for state, move, record in zip(previous, records['last_move'], records['state']):
+                self.assertTrue(np.array_equal(apply_moves(state, [MOVES[move]]), record))
+            previous, last = records['state'], records['last_move']
+
+    def test_generate(self):
+        blocks = list(generate(1000, 7, n_walks=30, rng=0, label=lambda states: np.zeros(len(states))))
+        self.assertEqual(sum(map(len, blocks)), 1000)
+        self.assertEqual(blocks[0].dtype, record_dtype(labelled=True))
+        self.assertTrue(all((b['depth'] <= 7).all() for b in blocks))
+
+    def test_shards(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.assertEqual(write_dataset(directory, 2500, 10, shard_size=1000, seed=0), 2500)
+            with open(os.path.join(directory, 'index.json')) as f:
+                index = json.load(f)
+            self.assertEqual([n for _, n in index['shards']], [1000, 1000, 500])
+            records = np.concatenate([np.load(os.path.join(directory, name)) for name, _ in index['shards']])
+            blocks = np.concatenate(list(generate(2500, 10, rng=0)))
+            self.assertTrue(np.array_equal(records, blocks))
+            with self.assertRaises(TypeError):
+                ShardWriter(directory, labelled=True).write(blocks)
+
+
+## class test for the memory-mapped reader ##
+class TestReader(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        write_dataset(cls.directory.name, 2500, 10, shard_size=1000, seed=0)
+        cls.records = np.concatenate(list(generate(2500, 10, rng=0)))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    def test_mmap(self):
+        reader = ShardReader(self.directory.name)
+        self.assertEqual(len(reader), 2500)
+        self.assertIsInstance(reader.shards[0], np.memmap)
+        self.assertEqual(reader.meta['max_depth'], 10)
+
+    ## random access across shards, in any order ##
+    def test_indexing(self):
+        reader = ShardReader(self.directory.name)
+        indices = np.array([2499, 0, 1000, 999, 1500, -1])
+        batch = reader[indices]
+        self.assertTrue(np.array_equal(batch['state'], self.records['state'][indices]))
+        self.assertTrue(np.array_equal(batch['last_move'], self.records['last_move'][indices]))
+        self.assertTrue(batch['state'].flags['C_CONTIGUOUS'])
+        self.assertEqual(reader[3]['depth'], self.records['depth'][3])
+        with self.assertRaises(IndexError):
+            reader[[2500]]
+
+    def test_sample(self):
+        reader = ShardReader(self.directory.name)
+        batch = reader.sample(64, rng=0)
+        self.assertEqual(batch['state'].shape, (64, 40))
+        self.assertTrue((batch['depth'] >= 1).all() and (batch['depth'] <= 10).all())
+
+    def test_epoch(self):
+        reader = ShardReader(self.directory.name)
+        batches = list(reader.batches(600, rng=0))
+        self.assertEqual([len(b['depth']) for b in batches], [600, 600, 600, 600, 100])
+        states = np.concatenate([b['state'] for b in batches])
+        self.assertTrue(np.array_equal(np.unique(states, axis=0), np.unique(self.records['state'], axis=0)))
+        self.assertEqual(len(list(reader.batches(600, drop_last=True))), 4)
+
+
+
+
+
+if __name__ == '__main__':
+    unittest.main()
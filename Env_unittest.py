@@ -0,0 +1,172 @@
+###############################################################################
+# The copyright of this code, including all portions, content, design, text,  #
+# output and the selection and arrangement of the subroutines is owned by     #
+# the Authors and by CNR, unless otherwise indicated, and is protected by the #
+# provisions of the Italian Copyright law.                                    #
+#                                                                             #
+# All rights reserved. This software may not be reproduced or distributed, in #
+# whole or in part, without the prior written permission of the Authors.      #
+# However, reproduction and distribution, in whole or in part, by non-profit, #
+# research or educational institutions for their own use is permitted if      #
+# proper credit is given, with full citation, and copyright is acknowledged.  #
+# Any other reproduction or distribution, in whatever form and by whatever    #
+# media, is expressly prohibited without the prior written consent of the     #
+# Authors. For further information, please contact CNR.                       #
+# Contact person:           enrico.prati@cnr.it                               #
+#                                                                             #
+# Concept and development:  Sebastiano Corli, Lorenzo Moro, Enrico Prati      #
+# Year:                     2022                                              #
+# Istituto di Fotonica e Nanotecnologie - Consiglio Nazionale delle Ricerche  #
+###############################################################################
+
+from Rubik import RubiksGroup, CompactRubiksCube, MOVES
+from environment import RubiksEnv, one_hot, ONE_HOT_SIZE, gym
+from vector_env import VectorRubiksEnv, SubprocVectorRubiksEnv
+import numpy as np
+import unittest
+import warnings
+
+
+
+## class test for the one-hot encoding of compact states ##
+class TestOneHot(unittest.TestCase):
+    def test_solved(self):
+        obs = one_hot(CompactRubiksCube().state)
+        self.assertEqual(obs.shape, (ONE_HOT_SIZE,))
+        self.assertEqual(obs.sum(), 20)
+
+    ## a batch of states is encoded row by row ##
+    def test_batch(self):
+        K = RubiksGroup.R() * CompactRubiksCube()
+        states = np.stack([CompactRubiksCube().state, K.state])
+        obs = one_hot(states, dtype=np.uint8)
+        self.assertEqual(obs.shape, (2, ONE_HOT_SIZE))
+        self.assertTrue(np.array_equal(obs[1], one_hot(K.state, dtype=np.uint8)))
+        self.assertFalse(np.array_equal(obs[0], obs[1]))
+
+
+## class test for the environment ##
+class TestEnvironment(unittest.TestCase):
+    def setUp(self):
+        self.env = RubiksEnv(scramble_depth=0, max_steps=3)
+
+    def tearDown(self):
+        if 'sexy' in RubiksGroup.macros(): RubiksGroup.unregister_macro('sexy')
+
+    def test_solvedReward(self):
+        obs, info = self.env.reset(seed=0)
+        self.assertTrue(np.array_equal(obs, one_hot(CompactRubiksCube().state)))
+        ## U followed by U' solves the Cube again ##
+        self.env.step(self.env.actions.index('U'))
+        obs, reward, terminated, truncated, _ = self.env.step(self.env.actions.index("U'"))
+        self.assertTrue(terminated)
+        self.assertFalse(truncated)
+        self.assertEqual(reward, 1.0)
+
+    def test_truncation(self):
+        self.env.reset()
+        for _ in range(3):
+            obs, reward, terminated, truncated, _ = self.env.step(self.env.actions.index('R'))
+        self.assertFalse(terminated)
+        self.assertTrue(truncated)
+
+    ## fresh observations at every call, as checked by gymnasium ##
+    @unittest.skipIf(gym is None, "gymnasium is not installed")
+    def test_checkEnv(self):
+        from gymnasium.utils.env_checker import check_env
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            check_env(RubiksEnv(n_actions=18))
+        obs, _ = self.env.reset()
+        self.assertIsNot(self.env.step(0)[0], obs)
+        env = RubiksEnv(copy_obs=False)
+        obs, _ = env.reset()
+        self.assertIs(env.step(0)[0], obs)
+
+    ## the observation must follow the compact state of the Cube ##
+    def test_observation(self):
+        self.env.reset(options={'scramble_depth': 5})
+        for _ in range(4):
+            obs, *_ = self.env.step(1)
+            self.assertTrue(np.array_equal(obs, one_hot(self.env.cube.state)))
+
+    def test_scrambleRange(self):
+        env = RubiksEnv(n_actions=18, scramble_depth=(2, 4))
+        self.assertEqual(env.actions, MOVES)
+        for seed in range(5):
+            _, info = env.reset(seed=seed)
+            self.assertIn(info['scramble_depth'], [2, 3, 4])
+
+    def test_wrongActions(self):
+        with self.assertRaises(TypeError):
+            RubiksEnv(n_actions=6)
+        with self.assertRaises(TypeError):
+            RubiksEnv(macros=['not registered'])
+
+    ## a macro-action acts as its whole sequence in a single step ##
+    def test_macros(self):
+        env = RubiksEnv(scramble_depth=0, macros={'sexy': "R U R' U'"})
+        self.assertEqual(env.actions[-1], 'sexy')
+        ## the same definition may be given again, a different one may not ##
+        RubiksEnv(scramble_depth=0, macros={'sexy': ['R', 'U', "R'", "U'"]})
+        with self.assertRaises(TypeError):
+            RubiksEnv(scramble_depth=0, macros={'sexy': "R U"})
+        env.reset()
+        obs, *_ = env.step(env.actions.index('sexy'))
+        K = CompactRubiksCube()
+        for name in ['R', 'U', "R'", "U'"]: K = RubiksGroup.move(name) * K
+        self.assertEqual(env.cube, K)
+        self.assertTrue(np.array_equal(obs, one_hot(K.state)))
+        ## the sexy move has order 6 ##
+        for _ in range(5):
+            _, reward, terminated, *_ = env.step(12)
+        self.assertTrue(terminated)
+
+## class test for the vectorized environments ##
+class TestVectorEnvironment(unittest.TestCase):
+    def tearDown(self):
+        if 'sune' in RubiksGroup.macros(): RubiksGroup.unregister_macro('sune')
+
+    def test_autoreset(self):
+        env = VectorRubiksEnv(4, scramble_depth=0, max_steps=2)
+        obs, _ = env.reset(seed=0)
+        R, R_ = env.actions.index('R'), env.actions.index("R'")
+        env.step([R, R, R, R])
+        obs, rewards, terminated, truncated, _ = env.step([R_, R, R_, R])
+        self.assertTrue(np.array_equal(terminated, [True, False, True, False]))
+        self.assertTrue(np.array_equal(truncated, [False, True, False, True]))
+        self.assertTrue(np.array_equal(rewards, [1., 0., 1., 0.]))
+        ## all the environments have been restarted from the solved state ##
+        self.assertTrue(env.cubes.is_solved().all())
+        self.assertTrue(np.array_equal(obs, one_hot(env.cubes.state)))
+
+    ## the process pool must produce the same observations as a single process ##
+    def test_subprocess(self):
+        with SubprocVectorRubiksEnv(6, n_workers=2, scramble_depth=0, max_steps=10) as pool:
+            env = VectorRubiksEnv(6, scramble_depth=0, max_steps=10)
+            pool.reset()
+            env.reset()
+            for a in [0, 3, 5, 7]:
+                obs, rewards, terminated, truncated, _ = pool.step(np.full(6, a))
+                env.step(np.full(6, a))
+                self.assertTrue(np.array_equal(obs, env.obs))
+
+    def test_macros(self):
+        RubiksGroup.register_macro('sune', "R U R' U R U2 R'")
+        with SubprocVectorRubiksEnv(4, n_workers=2, scramble_depth=0, macros=['sune']) as pool:
+            env = VectorRubiksEnv(4, scramble_depth=0, macros=['sune'])
+            self.assertEqual(pool.actions, env.actions)
+            pool.reset()
+            env.reset()
+            actions = np.array([12, 12, 0, 12])
+            obs, *_ = pool.step(actions)
+            env.step(actions)
+            self.assertTrue(np.array_equal(obs, env.obs))
+            self.assertEqual(env.cubes[0], RubiksGroup.macro('sune') * CompactRubiksCube())
+
+
+
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -35,6 +35,9 @@ class RubiksCube:
                                      axis=0)
         ## allocate the actual state of the Cube ##
         self.Cube = state_vector if state_vector is not None else copy(self.solved)
+        ## undo stack of apply(), allocated at the first call ##
+        self._depth = 0
+        self._undo_cubies = self._undo_operators = None
 
     ## print function should return the self.Cube, i.e. the state vector ##
     def __repr__(self):
@@ -43,14 +46,291 @@ class RubiksCube:
     def __eq__(self, other):
         return all(e1 == e2 for e1, e2 in zip(self.Cube, other.Cube))
 
-    ## reset the Cube to its solved state ##
+    ## equal Cubes share the same compact state, hence the same hash ##
+    def __hash__(self):
+        return hash(self.compact())
+
+    ## reset the Cube to its solved state (the undo stack is emptied) ##
     def reset(self):
         self.Cube = copy(self.solved)
+        self._depth = 0
 
     ## function to determine whether the Cube is solved or not ##
+    ## (flyweight cubies are compared by identity)            ##
+    def is_solved(self):
+        return all(c1 is c2 or c1 == c2 for c1, c2 in zip(self.Cube, self.solved))
+
+    ## return the same state in the compact (integer array) representation ##
+    def compact(self):
+        return CompactRubiksCube.from_cube(self)
+
+    ###################
+    ## MAKE / UNMAKE ##
+    ###################
+
+    ## apply() acts in place (like operator * Cube) and pushes the cubies of the ##
+    ## slots the operator rewrites on a preallocated stack; undo() puts them    ##
+    ## back. Searches need no copy of the Cube per node. The stack grows by     ##
+    ## doubling, so pushes and pops allocate nothing on the way                 ##
+    def apply(self, operator):
+        if isinstance(operator, str):
+            operator = RubiksGroup.action(operator)
+        slots = operator.touched_slots()
+        if self._undo_operators is None or self._depth == len(self._undo_operators):
+            self._undo_cubies = _grow_stack(self._undo_cubies, (len(self.Cube),), object)
+            self._undo_operators = _grow_stack(self._undo_operators, (), object)
+        np.take(self.Cube, slots, out=self._undo_cubies[self._depth, :len(slots)])
+        self._undo_operators[self._depth] = operator
+        self._depth += 1
+        operator * self
+        return self
+
+    ## copy() snapshots the cubies (immutable, so the array is copied shallowly) ##
+    ## with a fresh undo stack: apply() would otherwise rewrite both Cubes     ##
+    def __copy__(self):
+        return RubiksCube(self.Cube.copy())
+
+    ## revert the last apply() ##
+    def undo(self):
+        if self._depth == 0:
+            raise IndexError("undo from an empty stack")
+        self._depth -= 1
+        slots = self._undo_operators[self._depth].touched_slots()
+        np.put(self.Cube, slots, self._undo_cubies[self._depth, :len(slots)])
+        self._undo_operators[self._depth] = None
+        return self
+
+    ## number of moves that can be undone ##
+    @property
+    def depth(self):
+        return self._depth
+
+
+## stack of capacity rows of the given shape, twice as large as (and starting with) stack ##
+def _grow_stack(stack, shape, dtype, capacity=64):
+    if stack is None:
+        return np.empty((capacity,) + shape, dtype=dtype)
+    grown = np.empty((2 * len(stack),) + shape, dtype=dtype)
+    grown[:len(stack)] = stack
+    return grown
+
+
+
+
+#####################################
+## RUBIK'S CUBE (compact, integer) ##
+#####################################
+
+## Coordinates of the slots of the Cube, relative to slot 0 (edges) and slot 12 (corners) ##
+## they are consistent with the translations defined by the generators of RubiksGroup    ##
+EDGE_POSITIONS = np.array([[ 0, 0, 0], [-1, 1, 0], [ 0, 2, 0], [ 1, 1, 0],
+                           [ 0, 0, 2], [-1, 1, 2], [ 0, 2, 2], [ 1, 1, 2],
+                           [-1, 0, 1], [-1, 2, 1], [ 1, 0, 1], [ 1, 2, 1]])
+CORNER_POSITIONS = np.array([[ 0, 0, 0], [-1, 0, 0], [-1, 1, 0], [ 0, 1, 0],
+                             [ 0, 0, 1], [-1, 0, 1], [-1, 1, 1], [ 0, 1, 1]])
+
+## Layout of the compact state vector (40 uint8 entries):       ##
+## edge permutation, edge flips, corner permutation, corner twists ##
+EP, EO, CP, CO = slice(0, 12), slice(12, 24), slice(24, 32), slice(32, 40)
+STATE_SIZE = 40
+## modulus of every entry of the state vector ##
+MODULI = np.array([12]*12 + [2]*12 + [8]*8 + [3]*8, dtype=np.uint8)
+## solved state: every cubie in its own slot, with null flip and twist ##
+SOLVED_STATE = np.concatenate((np.arange(12), np.zeros(12), np.arange(8), np.zeros(8))).astype(np.uint8)
+
+## Names of the face turns: X is the generator, X' its inverse and X2 the half turn ##
+FACES = ['U', 'D', 'L', 'R', 'F', 'B']
+MOVES = [face + suffix for face in FACES for suffix in ('', "'", '2')]
+
+
+class CompactRubiksCube:
+    ## the state is stored as a single uint8 array:                           ##
+    ## state[EP][j] is the (home) index of the edge lying in the j-th slot,   ##
+    ## state[EO][j] its flip (mod 2), state[CP] and state[CO] the same for    ##
+    ## corners (twists are mod 3). The whole Cube fits in 40 bytes.           ##
+    def __init__(self, state_vector=None):
+        if state_vector is None:
+            self.state = SOLVED_STATE.copy()
+        else:
+            self.state = np.asarray(state_vector, dtype=np.uint8)
+            if self.state.shape != (STATE_SIZE,):
+                raise TypeError(f"State vector must have shape ({STATE_SIZE},), not {self.state.shape}")
+        self._depth = 0
+        self._undo_states = None
+
+    ## views on the four components of the state ##
+    @property
+    def edge_permutation(self):
+        return self.state[EP]
+
+    @property
+    def edge_orientation(self):
+        return self.state[EO]
+
+    @property
+    def corner_permutation(self):
+        return self.state[CP]
+
+    @property
+    def corner_orientation(self):
+        return self.state[CO]
+
+    def __repr__(self):
+        return "EP %s\nEO %s\nCP %s\nCO %s" % (self.state[EP], self.state[EO], self.state[CP], self.state[CO])
+
+    def __eq__(self, other):
+        return np.array_equal(self.state, other.state)
+
+    ## the 40 bytes of the state are a canonical key ##
+    def __hash__(self):
+        return hash(self.state.tobytes())
+
+    ## reset the Cube to its solved state (the undo stack is emptied) ##
+    def reset(self):
+        self.state = SOLVED_STATE.copy()
+        self._depth = 0
+
+    ## function to determine whether the Cube is solved or not ##
+    def is_solved(self):
+        return np.array_equal(self.state, SOLVED_STATE)
+
+    ###################
+    ## MAKE / UNMAKE ##
+    ###################
+
+    ## apply() rewrites the state in place and pushes the previous one (40 bytes) ##
+    ## on a preallocated stack, undo() restores it. The state array is copied   ##
+    ## once, when the stack is allocated, so arrays passed to __init__ are kept  ##
+    def apply(self, operator):
+        if isinstance(operator, str):
+            operator = RubiksGroup.action(operator)
+        src, delta = operator.compile()
+        if self._undo_states is None:
+            self.state = self.state.copy()
+            self._scratch = np.empty(STATE_SIZE, dtype=np.uint8)
+        if self._undo_states is None or self._depth == len(self._undo_states):
+            self._undo_states = _grow_stack(self._undo_states, (STATE_SIZE,), np.uint8)
+        self._undo_states[self._depth] = self.state
+        self._depth += 1
+        np.take(self.state, src, out=self._scratch)
+        np.add(self._scratch, delta, out=self.state)
+        np.remainder(self.state, MODULI, out=self.state)
+        return self
+
+    ## copy() snapshots the state with a fresh undo stack: apply() rewrites ##
+    ## the state in place, which would otherwise be shared                 ##
+    def __copy__(self):
+        return CompactRubiksCube(self.state.copy())
+
+    ## revert the last apply() ##
+    def undo(self):
+        if self._depth == 0:
+            raise IndexError("undo from an empty stack")
+        self._depth -= 1
+        self.state[:] = self._undo_states[self._depth]
+        return self
+
+    ## number of moves that can be undone ##
+    @property
+    def depth(self):
+        return self._depth
+
+    #################
+    ## CONVERSIONS ##
+    #################
+
+    ## build the compact state from a RubiksCube made of Edge/Corner objects ##
+    @classmethod
+    def from_cube(cls, cube):
+        state = np.empty(STATE_SIZE, dtype=np.uint8)
+        edge_homes = {tuple(pos): i for i, pos in enumerate(EDGE_POSITIONS)}
+        corner_homes = {tuple(pos): i for i, pos in enumerate(CORNER_POSITIONS)}
+        for j, edge in enumerate(cube.Cube[:12]):
+            ## the cubie in the j-th slot has been displaced by (x,y,z) from its home ##
+            state[j] = edge_homes[tuple(EDGE_POSITIONS[j] - (edge.x, edge.y, edge.z))]
+            ## [1,0] is the null flip, [0,1] the flipped state ##
+            state[12 + j] = edge.code
+        for j, corner in enumerate(cube.Cube[12:]):
+            state[24 + j] = corner_homes[tuple(CORNER_POSITIONS[j] - (corner.x, corner.y, corner.z))]
+            ## [0,1,0] is the null twist, Sigma.C adds +1 and Sigma.A adds -1 (mod 3) ##
+            state[32 + j] = corner.code
+        return cls(state)
+
+    ## build the equivalent RubiksCube made of Edge/Corner objects ##
+    def to_cube(self):
+        edges = [Edge(*(EDGE_POSITIONS[j] - EDGE_POSITIONS[e]).tolist(), vector=np.roll([1., 0.], f))
+                 for j, (e, f) in enumerate(zip(self.state[EP], self.state[EO]))]
+        corners = [Corner(*(CORNER_POSITIONS[j] - CORNER_POSITIONS[c]).tolist(), vector=np.roll([0., 1., 0.], t))
+                   for j, (c, t) in enumerate(zip(self.state[CP], self.state[CO]))]
+        return RubiksCube(np.array(edges + corners, dtype=object))
+
+
+
+
+############################
+## RUBIK'S CUBE (batched) ##
+############################
+class BatchedRubiksCube:
+    ## N compact states stored as the rows of a single (N, 40) uint8 matrix ##
+    def __init__(self, n=1, state_matrix=None):
+        if state_matrix is None:
+            self.state = np.tile(SOLVED_STATE, (n, 1))
+        else:
+            self.state = np.asarray(state_matrix, dtype=np.uint8)
+            if self.state.ndim != 2 or self.state.shape[1] != STATE_SIZE:
+                raise TypeError(f"State matrix must have shape (N, {STATE_SIZE}), not {self.state.shape}")
+        ## row indices used to gather a different move for every Cube ##
+        self._rows = np.arange(len(self.state))[:, None]
+
+    ## stack single Cubes (RubiksCube or CompactRubiksCube) into a batch ##
+    @classmethod
+    def from_cubes(cls, cubes):
+        return cls(state_matrix=np.stack([(c if isinstance(c, CompactRubiksCube) else c.compact()).state for c in cubes]))
+
+    def __len__(self):
+        return len(self.state)
+
+    ## the i-th Cube of the batch, as an independent CompactRubiksCube ##
+    def __getitem__(self, i):
+        return CompactRubiksCube(self.state[i].copy())
+
+    def __repr__(self):
+        return str(self.state)
+
+    def __eq__(self, other):
+        return np.array_equal(self.state, other.state)
+
+    ## reset all the Cubes, or only those selected by a boolean mask ##
+    def reset(self, mask=None):
+        if mask is None:
+            self.state = np.tile(SOLVED_STATE, (len(self), 1))
+        else:
+            self.state[mask] = SOLVED_STATE
+
+    ## boolean array telling which Cubes are solved ##
     def is_solved(self):
-        return all(self.Cube == self.solved)
+        return (self.state == SOLVED_STATE).all(axis=1)
+
+    ## apply actions[i] (an index in MOVES) to the i-th Cube, all in one gather; ##
+    ## with tables (e.g. RubiksGroup.action_tables) actions index their rows     ##
+    def step(self, actions, tables=None):
+        src, delta = RubiksGroup.move_tables() if tables is None else tables
+        actions = np.asarray(actions)
+        self.state = (self.state[self._rows, src[actions]] + delta[actions]) % MODULI
+        return self
 
+    ## successors of every Cube by every face turn (or by the rows of tables): returns ##
+    ## the (N, 18, 40) successor states and their (N, 18) solved mask, see            ##
+    ## RubiksGroup.successors                                                        ##
+    def successors(self, tables=None, out=None):
+        return RubiksGroup.successors(self.state, tables, out)
+
+    ## apply depth random face turns to every Cube ##
+    def scramble(self, depth, rng=None):
+        rng = np.random.default_rng() if rng is None else rng
+        for _ in range(depth):
+            self.step(rng.integers(len(MOVES), size=len(self)))
+        return self
 
 
 
@@ -89,6 +369,11 @@ class RubiksGroup():
     ## Action on the Cube vector ##
     ###############################
     def __mul__(self, Cube):
+        ## compact Cubes (single or batched) are acted upon by a gather plus a modular add ##
+        if isinstance(Cube, (CompactRubiksCube, BatchedRubiksCube)):
+            src, delta = self.compile()
+            Cube.state = (Cube.state[..., src] + delta) % MODULI
+            return Cube
         ## single cubie transformations ##
         for te in self.edge_transl.items():
             Cube.Cube[te[0]] *= te[1]
@@ -104,6 +389,30 @@ class RubiksGroup():
         Cube.Cube = self.Pc * Cube.Cube
         return Cube
 
+    ## indices of the Cube vector rewritten by the operator (see RubiksCube.apply) ##
+    def touched_slots(self):
+        try:
+            return self._touched
+        except AttributeError:
+            slots = {*self.edge_transl, *self.edge_flip, *self.corner_transl, *self.corner_rot}
+            for P in (self.Pe, self.Pc):
+                slots.update(np.ravel(P.cycle1).tolist(), np.ravel(P.cycle2).tolist())
+            self._touched = np.array(sorted(slots), dtype=np.intp)
+            return self._touched
+
+    ## Compile the operator into the index/offset arrays acting on compact states ##
+    ## new_state = (state[src] + delta) % MODULI                                   ##
+    def compile(self):
+        try:
+            return self._table
+        except AttributeError:
+            ## the image of the solved state encodes the whole operator ##
+            image = (self * RubiksCube()).compact().state
+            src = np.concatenate((image[EP], 12 + image[EP], 24 + image[CP], 32 + image[CP])).astype(np.intp)
+            delta = np.concatenate((np.zeros(12), image[EO], np.zeros(8), image[CO])).astype(np.uint8)
+            self._table = (src, delta)
+            return self._table
+
     ##############################
     ## Composition of operators ##
     ##############################
@@ -111,49 +420,119 @@ class RubiksGroup():
     ## Useful functions     ##
     ## compose translations ##
     def compose_translations(self, dic1, dic2, permutation):
-        ## newDic will be the dictionary of the composed operator ##
-        newDic = {}
         ## permutations of the second operator must be applied on the first one ##
         ## the reason of such operation depends from basics of group theory     ##
-        for key in [*dic1]:
-            if key in permutation.cycle1: newDic[permutation.convert()[key]] = dic1[key]
+        ## permutation is the DensePermutation of the second operator, so that  ##
+        ## the keys left in place by it are kept (and composed) as well         ##
+        newDic = {int(permutation.image[key]): value for key, value in dic1.items()}
         ## find common keys between dic2 and newDic ##
         common_elements = set(newDic.keys()) & set(dic2.keys())
         ## compose common elements in newDic ##
         for elem in common_elements: newDic[elem] *= dic2[elem]
-        ## add the items from dic1 and dic2 whose keys are not in newDic ##
+        ## add the items from dic2 whose keys are not in newDic ##
         newDic = dict(list(dic2.items()) + list(newDic.items()))
-        newDic = dict(list(dic1.items()) + list(newDic.items()))
         ## return keys and values from newDic ##
         return [*newDic], [*newDic.values()]
 
     ## compose orientations ##
     def compose_orientations(self, dic1, dic2, permutation):
-        newDic = {}
-        for key in [*dic1]:
-            if key in permutation.cycle1: newDic[permutation.convert()[key]] = dic1[key]
+        newDic = {int(permutation.image[key]): value for key, value in dic1.items()}
         common_elements = set(newDic.keys()) & set(dic2.keys())
         for elem in common_elements: newDic[elem] @= dic2[elem]
         newDic = dict(list(dic2.items()) + list(newDic.items()))
-        newDic = dict(list(dic1.items()) + list(newDic.items()))
         return [*newDic.values()]
 
     ## Composition ##
     def __matmul__(self, other):
         ## COMPOSE PERMUTATIONS ##
-        perm_e = self.Pe @ other.Pe
-        perm_c = self.Pc @ other.Pc
+        ## dense images over the 20 slots of the Cube ##
+        other_e, other_c = other.Pe.dense(20), other.Pc.dense(20)
+        perm_e = (self.Pe.dense(20) @ other_e).to_cycles()
+        perm_c = (self.Pc.dense(20) @ other_c).to_cycles()
         ## COMPOSE OPERATORS ##
         ## edge translations ##
-        edges, edge_translations = self.compose_translations(self.edge_transl, other.edge_transl, other.Pe)
+        edges, edge_translations = self.compose_translations(self.edge_transl, other.edge_transl, other_e)
         ## corner translations ##
-        corners, corner_translations = self.compose_translations(self.corner_transl, other.corner_transl, other.Pc)
+        corners, corner_translations = self.compose_translations(self.corner_transl, other.corner_transl, other_c)
         ## edge orientation ##
-        edge_orientations = self.compose_orientations(self.edge_flip, other.edge_flip, other.Pe)
+        edge_orientations = self.compose_orientations(self.edge_flip, other.edge_flip, other_e)
         ## corner orientation ##
-        corner_orientations = self.compose_orientations(self.corner_rot, other.corner_rot, other.Pc)
+        corner_orientations = self.compose_orientations(self.corner_rot, other.corner_rot, other_c)
+
+        composed = RubiksGroup(edges, edge_translations, edge_orientations, perm_e, corners, corner_translations, corner_orientations, perm_c)
+        ## when both operators are already compiled, their tables are composed directly ##
+        if hasattr(self, '_table') and hasattr(other, '_table'):
+            composed._table = self.compose_tables(self._table, other._table)
+        return composed
+
+    ## composition of two compiled tables: (A @ B) acts first with B, then with A ##
+    @staticmethod
+    def compose_tables(table1, table2):
+        src1, delta1 = table1
+        src2, delta2 = table2
+        return src2[src1], (delta2[src1] + delta1) % MODULI
+
+    ## build the operator (dictionaries and permutations) from a compiled table ##
+    @classmethod
+    def from_table(cls, table):
+        src, delta = table
+        ## slots whose content is moved or reoriented, listed by arrival slot j ##
+        edges = [j for j in range(12) if src[j] != j or delta[12 + j]]
+        corners = [j for j in range(8) if src[24 + j] != 24 + j or delta[32 + j]]
+        ## the dictionaries are keyed by the slot the cubie comes from, src[j] ##
+        edge_flips = [Sigma.X() if delta[12 + j] else Sigma(np.eye(2)) for j in edges]
+        corner_rots = [[Sigma(np.eye(3)), Sigma.C(), Sigma.A()][delta[32 + j]] for j in corners]
+        operator = cls([int(src[j]) for j in edges],
+                       [T(*(EDGE_POSITIONS[j] - EDGE_POSITIONS[src[j]]).tolist()) for j in edges],
+                       edge_flips,
+                       DensePermutation(src[EP]).to_cycles(),
+                       [12 + int(src[24 + j]) - 24 for j in corners],
+                       [T(*(CORNER_POSITIONS[j] - CORNER_POSITIONS[src[24 + j] - 24]).tolist()) for j in corners],
+                       corner_rots,
+                       DensePermutation(np.concatenate((np.arange(12), 12 + src[CP] - 24))).to_cycles())
+        operator._table = (src, delta)
+        return operator
+
+    ## the operator leaving every cubie in place ##
+    @classmethod
+    def identity(cls):
+        return cls.from_table((np.arange(STATE_SIZE), np.zeros(STATE_SIZE, dtype=np.uint8)))
+
+
+    ########################
+    ## INVERSE AND POWERS ##
+    ########################
 
-        return RubiksGroup(edges, edge_translations, edge_orientations, perm_e, corners, corner_translations, corner_orientations, perm_c)
+    ## Powers (also negative) are computed on the compiled tables by repeated ##
+    ## squaring and memoized on the operator, so U', U2, ... are built once   ##
+    def __pow__(self, k):
+        try:
+            powers = self._powers
+        except AttributeError:
+            powers = self._powers = {1: self}
+        if k not in powers:
+            if k < 0:
+                powers[k] = (self ** -1) ** -k if k != -1 else self.__class__.from_table(self.inverse_table())
+                ## the inverse of the inverse is the operator itself ##
+                if k == -1: powers[k]._powers = {1: powers[k], -1: self}
+            else:
+                power, base, n = (np.arange(STATE_SIZE), np.zeros(STATE_SIZE, dtype=np.uint8)), self.compile(), k
+                while n:
+                    if n & 1: power = self.compose_tables(power, base)
+                    base = self.compose_tables(base, base)
+                    n >>= 1
+                powers[k] = self.__class__.from_table(power)
+        return powers[k]
+
+    def inverse(self):
+        return self ** -1
+
+    ## compiled table of the inverse: state[i] = new_state[inv[i]] - delta[inv[i]] ##
+    def inverse_table(self):
+        src, delta = self.compile()
+        inverse = np.empty_like(src)
+        inverse[src] = np.arange(len(src))
+        return inverse, (MODULI - delta[inverse]) % MODULI
 
 
     ######################
@@ -251,5 +630,133 @@ class RubiksGroup():
         return reduce(lambda x, y: x @ y, operators_to_compose)
 
 
+    ################
+    ## FACE TURNS ##
+    ################
+
+    ## The 18 face turns (clockwise, anticlockwise and half turns) are built and ##
+    ## compiled once per class; the generators themselves are rebuilt at every   ##
+    ## call of U(), D(), ... so the cached operators should be used in loops     ##
+    _moves = None
+    _move_tables = None
+
+    @classmethod
+    def moves(cls):
+        if cls._moves is None:
+            moves = {}
+            for face in FACES:
+                O = getattr(cls, face)()
+                O.compile()
+                moves[face] = O
+                moves[face + '2'] = O ** 2
+                moves[face + "'"] = O ** -1
+            cls._moves = {name: moves[name] for name in MOVES}
+        return cls._moves
+
+    ## return the cached operator of a face turn, e.g. RubiksGroup.move("R'") ##
+    @classmethod
+    def move(cls, name):
+        try:
+            return cls.moves()[name]
+        except KeyError:
+            raise TypeError(f"{name} is not a face turn: allowed moves are {MOVES}")
+
+    ## index and offset arrays of the 18 face turns, stacked in the order of MOVES ##
+    ## shapes are (18, 40): row i acts as (state[src[i]] + delta[i]) % MODULI     ##
+    @classmethod
+    def move_tables(cls):
+        if cls._move_tables is None:
+            tables = [O.compile() for O in cls.moves().values()]
+            cls._move_tables = (np.stack([t[0] for t in tables]), np.stack([t[1] for t in tables]))
+        return cls._move_tables
+
+    ## all the successors of N compact states (a (N, 40) matrix or a BatchedRubiksCube) by ##
+    ## the 18 face turns, or by the rows of tables (e.g. action_tables), in a single     ##
+    ## contiguous (N, len(tables), 40) uint8 array (written in out when given), together ##
+    ## with the (N, len(tables)) boolean mask of the solved successors                   ##
+    @classmethod
+    def successors(cls, states, tables=None, out=None):
+        src, delta = cls.move_tables() if tables is None else tables
+        states = np.asarray(getattr(states, 'state', states), dtype=np.uint8)
+        if states.ndim != 2 or states.shape[1] != STATE_SIZE:
+            raise TypeError(f"States must have shape (N, {STATE_SIZE}), not {states.shape}")
+        shape = (len(states), len(src), STATE_SIZE)
+        if out is None:
+            out = np.empty(shape, dtype=np.uint8)
+        elif out.shape != shape or out.dtype != np.uint8 or not out.flags.c_contiguous:
+            raise TypeError(f"out must be a contiguous uint8 array of shape {shape}")
+        ## one gather for all the N x len(src) successors; as state[src] + delta < 2*MODULI, ##
+        ## the modulo is a minimum with the uint8 (wrapping) difference                       ##
+        np.take(states, src.ravel(), axis=1, out=out.reshape(len(states), -1))
+        np.add(out, delta, out=out)
+        np.minimum(out, out - MODULI, out=out)
+        return out, (out == SOLVED_STATE).all(axis=2)
+
+
+    #####################
+    ## MACRO-OPERATORS ##
+    #####################
+
+    ## Named macro-operators (commutators, OLL/PLL algorithms, ...) are compiled ##
+    ## once into single operators: as actions they cost one gather, like a face ##
+    ## turn. The registry is shared by the whole class (and by the process), so  ##
+    ## a name is never silently rebound: registering it again with a different  ##
+    ## operator raises unless overwrite=True, the same operator is a no-op       ##
+    _macros = {}
+
+    ## definition: an operator, or a sequence of face turns applied left to right ##
+    ## (a list of names or a string of names separated by spaces, e.g. "R U R' U'") ##
+    @classmethod
+    def register_macro(cls, name, definition, overwrite=False):
+        if not isinstance(name, str) or name in MOVES:
+            raise TypeError(f"{name!r} cannot name a macro: it must be a string other than a face turn")
+        if isinstance(definition, RubiksGroup):
+            O = definition
+        else:
+            sequence = definition.split() if isinstance(definition, str) else list(definition)
+            O = cls.compose_multipleOperators([cls.move(m) for m in reversed(sequence)]) if sequence else cls.identity()
+        src, delta = O.compile()
+        if name in cls._macros and not overwrite:
+            old_src, old_delta = cls._macros[name].compile()
+            if np.array_equal(src, old_src) and np.array_equal(delta, old_delta):
+                return cls._macros[name]
+            raise TypeError(f"{name} is already registered as another macro: pass overwrite=True to replace it")
+        cls._macros[name] = O
+        return O
+
+    @classmethod
+    def unregister_macro(cls, name):
+        O = cls.macro(name)
+        del cls._macros[name]
+        return O
+
+    @classmethod
+    def clear_macros(cls):
+        cls._macros.clear()
+
+    @classmethod
+    def macro(cls, name):
+        try:
+            return cls._macros[name]
+        except KeyError:
+            raise TypeError(f"{name} is not a registered macro: registered macros are {[*cls._macros]}")
+
+    @classmethod
+    def macros(cls):
+        return dict(cls._macros)
+
+    ## the operator of a face turn or of a registered macro ##
+    @classmethod
+    def action(cls, name):
+        return cls.move(name) if name in MOVES else cls.macro(name)
+
+    ## (src, delta) tables of the named actions (face turns and macros), stacked ##
+    ## in the given order: shapes are (len(names), 40), as for move_tables       ##
+    @classmethod
+    def action_tables(cls, names):
+        tables = [cls.action(name).compile() for name in names]
+        return np.stack([t[0] for t in tables]), np.stack([t[1] for t in tables])
+
+
 
 
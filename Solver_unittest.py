@@ -0,0 +1,242 @@
+###############################################################################
+# The copyright of this code, including all portions, content, design, text,  #
+# output and the selection and arrangement of the subroutines is owned by     #
+# the Authors and by CNR, unless otherwise indicated, and is protected by the #
+# provisions of the Italian Copyright law.                                    #
+#                                                                             #
+# All rights reserved. This software may not be reproduced or distributed, in #
+# whole or in part, without the prior written permission of the Authors.      #
+# However, reproduction and distribution, in whole or in part, by non-profit, #
+# research or educational institutions for their own use is permitted if      #
+# proper credit is given, with full citation, and copyright is acknowledged.  #
+# Any other reproduction or distribution, in whatever form and by whatever    #
+# media, is expressly prohibited without the prior written consent of the     #
+# Authors. For further information, please contact CNR.                       #
+# Contact person:           enrico.prati@cnr.it                               #
+#                                                                             #
+# Concept and development:  Sebastiano Corli, Lorenzo Moro, Enrico Prati      #
+# Year:                     2022                                              #
+# Istituto di Fotonica e Nanotecnologie - Consiglio Nazionale delle Ricerche  #
+###############################################################################
+
+from Rubik import RubiksCube, RubiksGroup, CompactRubiksCube, BatchedRubiksCube, MOVES, SOLVED_STATE
+from pattern_db import PatternDatabase
+from solver import IDAStarSolver, BidirectionalSolver, apply_moves, FOLLOWING, INVERSE_MOVES
+from search import BatchAStarSolver, BeamSearchSolver
+from environment import one_hot
+from two_phase import TwoPhaseSolver, tables, twist_coord, flip_coord, slice_coord, SLICE_GOAL, PHASE2_MOVES
+import numpy as np
+import unittest
+import tempfile
+import os
+
+
+
+## class test for the pattern databases ##
+class TestPatternDatabase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.db = PatternDatabase.build(edges=[0, 1], corners=[0])
+
+    def test_solved(self):
+        self.assertEqual(self.db(CompactRubiksCube().state), 0)
+        self.assertEqual(self.db((RubiksGroup.move('D') * CompactRubiksCube()).state), 1)
+
+    def test_indexing(self):
+        indices = np.arange(len(self.db))
+        self.assertTrue(np.array_equal(self.db.encode(self.db.decode(indices)), indices))
+
+    ## the distance of a pattern never exceeds the number of applied moves ##
+    def test_admissible(self):
+        rng = np.random.default_rng(0)
+        B = BatchedRubiksCube(500)
+        for depth in range(1, 6):
+            B.step(rng.integers(len(MOVES), size=len(B)))
+            self.assertTrue((self.db(B.state) <= depth).all())
+
+    ## the neighbouring patterns differ by one move at most ##
+    def test_consistent(self):
+        B = BatchedRubiksCube(200).scramble(10, np.random.default_rng(1))
+        h = self.db(B.state).astype(int)
+        for m in range(len(MOVES)):
+            successors = BatchedRubiksCube(state_matrix=B.state.copy()).step(np.full(len(B), m))
+            self.assertTrue((abs(self.db(successors.state) - h) <= 1).all())
+
+    def test_memmap(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'db.npy')
+            self.db.save(path)
+            db = PatternDatabase.load(path)
+            self.assertIsInstance(db.data, np.memmap)
+            self.assertTrue(np.array_equal(db.unpack(), self.db.unpack()))
+            del db
+
+## class test for the IDA* solver ##
+class TestIDAStar(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.solver = IDAStarSolver([PatternDatabase.build(corners=[0, 1, 2, 3]), PatternDatabase.build(edges=[0, 1, 2])])
+
+    def test_pruning(self):
+        ## after U neither U nor U', U2 are allowed; after D, U is not allowed ##
+        following_U = [MOVES[m] for m in FOLLOWING[MOVES.index('U')]]
+        following_D = [MOVES[m] for m in FOLLOWING[MOVES.index('D')]]
+        self.assertNotIn("U'", following_U)
+        self.assertIn('D', following_U)
+        self.assertNotIn('U', following_D)
+        self.assertEqual(len(FOLLOWING[len(MOVES)]), len(MOVES))
+
+    def test_solved(self):
+        self.assertEqual(self.solver.solve(RubiksCube()), [])
+
+    ## the solution of a scramble of n moves is optimal (n moves, for short scrambles) ##
+    def test_optimal(self):
+        for scramble in [['R'], ['R', 'U'], ['F2', "L'", 'D'], ['R', 'U', "R'", "U'"]]:
+            state = apply_moves(SOLVED_STATE, scramble)
+            solution = self.solver.solve(CompactRubiksCube(state))
+            self.assertEqual(len(solution), len(scramble))
+            self.assertTrue(np.array_equal(apply_moves(state, solution), SOLVED_STATE))
+
+    ## with a weak heuristic, solved children beyond the bound must not end the iteration ##
+    def test_weak_heuristic(self):
+        state = apply_moves(SOLVED_STATE, ['L', 'R2', 'B2', "R'", 'B2'])
+        self.assertEqual(len(IDAStarSolver([PatternDatabase.build(corners=[0], edges=[0])]).solve(state)), 5)
+        solver, exact = IDAStarSolver([PatternDatabase.build(corners=[0, 1, 2])]), BidirectionalSolver()
+        rng = np.random.default_rng(0)
+        for _ in range(12):
+            state = apply_moves(SOLVED_STATE, [MOVES[m] for m in rng.integers(len(MOVES), size=rng.integers(3, 7))])
+            self.assertEqual(len(solver.solve(state)), exact.distance(state))
+
+    def test_weighted(self):
+        solver = IDAStarSolver(self.solver.heuristics, weight=2.)
+        state = apply_moves(SOLVED_STATE, ['R', 'U', "F'", 'L2', 'D'])
+        self.assertTrue(np.array_equal(apply_moves(state, solver.solve(state)), SOLVED_STATE))
+
+    def test_budget(self):
+        solver = IDAStarSolver(node_budget=100)
+        state = apply_moves(SOLVED_STATE, ['R', 'U', "F'", 'L2', 'D', 'B'])
+        self.assertIsNone(solver.solve(state))
+        self.assertLessEqual(solver.nodes, 101)
+
+
+## class test for the bidirectional solver ##
+class TestBidirectional(unittest.TestCase):
+    def test_inverse(self):
+        for m in range(len(MOVES)):
+            state = apply_moves(SOLVED_STATE, [MOVES[m], MOVES[INVERSE_MOVES[m]]])
+            self.assertTrue(np.array_equal(state, SOLVED_STATE))
+
+    def test_solved(self):
+        self.assertEqual(BidirectionalSolver().solve(RubiksCube()), [])
+
+    ## optimal solutions, also when the two frontiers meet at odd total depths ##
+    def test_optimal(self):
+        solver = BidirectionalSolver()
+        for scramble in [['R'], ['R', 'U'], ['F2', "L'", 'D'], ['R', 'U', "R'", "U'", 'F'], ['R', 'U', "F'", 'L2', 'D', 'B']]:
+            state = apply_moves(SOLVED_STATE, scramble)
+            solution = solver.solve(CompactRubiksCube(state))
+            self.assertEqual(solver.distance(state), len(scramble))
+            self.assertTrue(np.array_equal(apply_moves(state, solution), SOLVED_STATE))
+
+    def test_max_depth(self):
+        state = apply_moves(SOLVED_STATE, ['R', 'U', "F'", 'L2'])
+        self.assertIsNone(BidirectionalSolver(max_depth=3).solve(state))
+        self.assertEqual(len(BidirectionalSolver(max_depth=4).solve(state)), 4)
+
+
+## class test for the two-phase solver ##
+class TestTwoPhase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.solver = TwoPhaseSolver(timeout=0.5)
+
+    ## the pruning tables reach every pair of coordinates ##
+    def test_tables(self):
+        for name, table in tables().items():
+            if name.endswith('prune'): self.assertFalse(np.any(table == 255))
+
+    ## the moves of G1 keep the phase-1 coordinates solved ##
+    def test_subgroup(self):
+        state = apply_moves(SOLVED_STATE, [MOVES[m] for m in PHASE2_MOVES] * 3)
+        self.assertEqual((twist_coord(state), flip_coord(state), slice_coord(state)), (0, 0, SLICE_GOAL))
+        state = apply_moves(state, ['R'])
+        self.assertNotEqual(twist_coord(state), 0)
+
+    def test_solved(self):
+        self.assertEqual(self.solver.solve(RubiksCube()), [])
+
+    def test_random(self):
+        cubes = BatchedRubiksCube(3)
+        cubes.scramble(30, np.random.default_rng(0))
+        for state, solution in zip(cubes.state, self.solver.solve_batch(cubes.state)):
+            self.assertTrue(np.array_equal(apply_moves(state, solution), SOLVED_STATE))
+            self.assertLessEqual(len(solution), 30)
+
+    ## the search stops at the first solution of target_length moves at most ##
+    def test_target(self):
+        state = apply_moves(SOLVED_STATE, ['R', 'U', "F'", 'L2', 'D', 'B'])
+        for target in [30, 6]:
+            solution = TwoPhaseSolver(target_length=target, timeout=10.).solve(state)
+            self.assertTrue(np.array_equal(apply_moves(state, solution), SOLVED_STATE))
+            self.assertLessEqual(len(solution), target)
+
+    ## the timeout is checked in both phases once a solution exists: with a null ##
+    ## timeout the first solution is returned, whatever the target length      ##
+    def test_timeout(self):
+        cubes = BatchedRubiksCube(3)
+        cubes.scramble(40, np.random.default_rng(1))
+        for state in cubes.state:
+            solver = TwoPhaseSolver(target_length=15, timeout=0.)
+            solution = solver.solve(state)
+            self.assertEqual(solution, TwoPhaseSolver(target_length=30).solve(state))
+            self.assertTrue(np.array_equal(apply_moves(state, solution), SOLVED_STATE))
+            self.assertGreater(solver.elapsed, 0.)
+
+
+
+## class test for the batched weighted A* and beam searches ##
+class TestBatchSearch(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.db = PatternDatabase.build(edges=[0, 1], corners=[0])
+        ## misplaced (cubie, orientation) pairs, computed on the one-hot encoding ##
+        goal = one_hot(SOLVED_STATE)
+        cls.misplaced = staticmethod(lambda x: (20 - x @ goal) / 8)
+        cls.scrambles = [['R'], ['F2', "L'", 'D'], ['R', 'U', "R'", "U'", 'F'], ['R', 'U', "F'", 'L2', 'D', 'B']]
+
+    def solvers(self):
+        return [BatchAStarSolver(self.db), BatchAStarSolver(self.misplaced, encode=one_hot, weight=2.0, batch_size=50),
+                BeamSearchSolver(self.db, beam_width=1024, max_depth=12),
+                BeamSearchSolver(self.misplaced, encode=one_hot, beam_width=256, max_depth=12)]
+
+    def test_solved(self):
+        for solver in self.solvers():
+            self.assertEqual(solver.solve(RubiksCube()), [])
+
+    def test_solve(self):
+        for solver in self.solvers():
+            for scramble in self.scrambles:
+                K = RubiksCube()
+                for m in scramble: RubiksGroup.move(m) * K
+                solution = solver.solve(K)
+                self.assertTrue(np.array_equal(apply_moves(K, solution), SOLVED_STATE))
+                ## many nodes are evaluated by every call to the heuristic (batches of ~100 or more) ##
+                if len(scramble) >= 5: self.assertLessEqual(20 * solver.evaluations, solver.nodes)
+
+    ## A* with an admissible heuristic and batches of one node: shortest solutions of short scrambles ##
+    def test_shortest(self):
+        solver = BatchAStarSolver(self.db, batch_size=1)
+        for scramble in self.scrambles[:3]:
+            self.assertEqual(len(solver.solve(apply_moves(SOLVED_STATE, scramble))), len(scramble))
+
+    def test_budget(self):
+        state = apply_moves(SOLVED_STATE, ['R', 'U', "F'", 'L2', 'D', 'B', "R'", 'U2'])
+        self.assertIsNone(BatchAStarSolver(self.db, node_budget=10).solve(state))
+        self.assertIsNone(BeamSearchSolver(self.db, beam_width=4, max_depth=2).solve(state))
+
+
+
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -22,6 +22,7 @@
 import numpy as np
 from numpy import array
 from itertools import permutations as p
+from copy import deepcopy
 
 
 ## Exponential class defines the position of the cubies ##
@@ -45,41 +46,166 @@ class Exponential:
 
 
 
+#######################
+## ORIENTATION MODES ##
+#######################
+
+## In the 'vector' mode (default) cubies keep their orientation as a one-hot ##
+## vector and Sigma acts on it by a matrix product. In the 'integer' mode    ##
+## they keep its code (flip mod 2, twist mod 3) and Sigma.X/A/C act by       ##
+## modular adds, on interned cubies (flyweights). Cubies of both modes expose ##
+## .orientation and .code, compare equal and can be mixed; the mode only      ##
+## affects the cubies built after it                                          ##
+ORIENTATION_MODES = ('vector', 'integer')
+_INTEGER = False
+
+
+def set_orientation_mode(mode):
+    global _INTEGER
+    if mode not in ORIENTATION_MODES:
+        raise TypeError(f"Orientation mode must be one of {ORIENTATION_MODES}, not {mode}")
+    _INTEGER = mode == 'integer'
+
+
+def orientation_mode():
+    return ORIENTATION_MODES[_INTEGER]
+
+
+## Validation tables, built once: the code of an edge orientation is the index ##
+## of its 1 ([1,0] -> 0), that of a corner the index minus one ([0,1,0] -> 0)   ##
+_EDGE_CODES = {v: v.index(1) for v in set(p([1, 0]))}
+_CORNER_CODES = {v: (v.index(1) - 1) % 3 for v in set(p([0, 1, 0]))}
+_EDGE_VECTORS = [np.roll([1., 0.], code) for code in range(2)]
+_CORNER_VECTORS = [np.roll([0., 1., 0.], code) for code in range(3)]
+for _vector in _EDGE_VECTORS + _CORNER_VECTORS: _vector.flags.writeable = False
+
+
+## interned cubies of the integer mode, keyed by (class, x, y, z, code) ##
+_INTERNED = {}
+
+
 ## Classes for cubies ##
+## In the vector mode cubies are plain (mutable) objects, as in the rest of the ##
+## object API. In the integer mode they are flyweights: there is a single       ##
+## immutable instance for every (class, position, orientation), which stores   ##
+## its code in _code, so operators return cached objects and equal flyweights  ##
+## are the same object                                                          ##
 class Cubie(Exponential):
+    ## orientation vectors indexed by their codes, and the codes of the vectors ##
+    ## (None for generic cubies)                                                ##
+    _vectors = _codes = None
+
     def __init__(self, vector=None, x=0, y=0, z=0):
         super().__init__(x, y, z)
         self.orientation = vector
 
+    ## flyweights are immutable ##
+    def __setattr__(self, name, value):
+        if '_code' in self.__dict__:
+            raise AttributeError(f"{self.__class__.__name__} flyweights are immutable")
+        object.__setattr__(self, name, value)
+
+    ## flyweights are never duplicated ##
+    def __copy__(self):
+        if '_code' in self.__dict__: return self
+        return _cubie(self.__class__, self.x, self.y, self.z, self.orientation)
+
+    def __deepcopy__(self, memo):
+        if '_code' in self.__dict__: return self
+        return _cubie(self.__class__, self.x, self.y, self.z, deepcopy(self.orientation, memo))
+
+    ## generic cubies take the vector first, edges and corners last ##
+    def __reduce__(self):
+        if self._codes is None:
+            return self.__class__, (self.orientation, self.x, self.y, self.z)
+        return self.__class__, (self.x, self.y, self.z, np.array(self.orientation))
+
+    ## the integer orientation: flip (mod 2) for edges, twist (mod 3) for corners ##
+    @property
+    def code(self):
+        code = self.__dict__.get('_code')
+        if code is None and self._codes is not None:
+            code = self._codes.get(tuple(np.asarray(self.orientation).tolist()))
+        return code
+
+    ## the same kind of cubie in (x, y, z), with its code shifted by shift (integer mode) ##
+    def _moved(self, x, y, z, shift=0):
+        code = self.__dict__.get('_code')
+        if code is not None:
+            return _interned(self.__class__, x, y, z, (code + shift) % len(self._vectors))
+        ## generic cubies keep their orientation as it is ##
+        if self._codes is None:
+            return _cubie(self.__class__, x, y, z, self.orientation)
+        return self.__class__(x, y, z, self.orientation)
+
     def __mul__(self, other):
-        return self.__class__(self.x + other.x, self.y + other.y, self.z + other.z, self.orientation)
+        return self._moved(self.x + other.x, self.y + other.y, self.z + other.z)
 
     def __repr__(self):
         return "(%s, %s, %s, %s)" % (self.x, self.y, self.z, self.orientation)
 
     def __eq__(self, other):
+        if self is other: return True
+        ## edges and corners are never equal, whatever their orientations ##
+        if type(self) is not type(other): return False
+        ## two distinct flyweights are different ##
+        if '_code' in self.__dict__ and '_code' in other.__dict__: return False
         ## Cubies are equal when all instance attributes (i.e. self.x,self.y,self.z and self.orientation) match ##
-        return list(self.__dict__.values())[:3] == list(other.__dict__.values())[:3] and np.array_equal(self.orientation, other.orientation)
+        return (self.x, self.y, self.z) == (other.x, other.y, other.z) and np.array_equal(self.orientation, other.orientation)
+
+
+## a cubie of class cls built without validation (code is given for flyweights only) ##
+def _cubie(cls, x, y, z, vector, code=None):
+    cubie = object.__new__(cls)
+    attributes = cubie.__dict__
+    attributes['x'], attributes['y'], attributes['z'], attributes['orientation'] = x, y, z, vector
+    if code is not None: attributes['_code'] = code
+    return cubie
+
+
+## the flyweight of (cls, x, y, z, code), built at the first request ##
+def _interned(cls, x, y, z, code):
+    key = (cls, x, y, z, code)
+    try:
+        return _INTERNED[key]
+    except KeyError:
+        cubie = _INTERNED[key] = _cubie(cls, x, y, z, cls._vectors[code], code)
+        return cubie
+
+
+## Edges and corners are built by __new__, which returns the flyweights in the integer mode ##
+def _new_cubie(cls, x, y, z, vector, name):
+    code = cls._codes.get(tuple(np.asarray(vector).tolist()))
+    if code is None:
+        raise TypeError(f"Vector {vector} does not match any {name} state of orientation")
+    if _INTEGER: return _interned(cls, x, y, z, code)
+    return _cubie(cls, x, y, z, vector)
 
 
 ## Define class for corner cubies ##
 class Corner(Cubie):
-    def __init__(self, x=0, y=0, z=0, vector=np.array([0.,1.,0.])):
+    _vectors, _codes = _CORNER_VECTORS, _CORNER_CODES
+
+    def __new__(cls, x=0, y=0, z=0, vector=np.array([0.,1.,0.])):
         ## the vector param must be a corner state of orientation               ##
         ## [0,1,0], [1,0,0], [0,0,1] numpy arrays are the three possible states ##
-        if not tuple(vector) in list(p([0,1,0])):
-            raise TypeError(f"Vector {vector} does not match any corner state of orientation")
-        super().__init__(vector, x,y,z)
+        return _new_cubie(cls, x, y, z, vector, 'corner')
+
+    def __init__(self, x=0, y=0, z=0, vector=None):
+        pass
 
 
 ## Define class for edge cubies ##
 class Edge(Cubie):
-    def __init__(self, x=0, y=0, z=0, vector=np.array([1.,0.])):
+    _vectors, _codes = _EDGE_VECTORS, _EDGE_CODES
+
+    def __new__(cls, x=0, y=0, z=0, vector=np.array([1.,0.])):
         ## the vector param must be an edge state of orientation   ##
         ## [0,1], [1,0] numpy arrays are the three possible states ##
-        if not tuple(vector) in list(p([1,0])):
-            raise TypeError(f"Vector {vector} does not match any edge state of orientation")
-        super().__init__(vector, x, y, z)
+        return _new_cubie(cls, x, y, z, vector, 'edge')
+
+    def __init__(self, x=0, y=0, z=0, vector=None):
+        pass
 
 
 
@@ -92,7 +218,7 @@ class Translation(Exponential):
         super().__init__(x,y,z)
 
     def __matmul__(self, cubie):
-        return cubie.__class__(self.x+cubie.x, self.y+cubie.y, self.z+cubie.z, cubie.orientation)
+        return cubie._moved(self.x+cubie.x, self.y+cubie.y, self.z+cubie.z)
 
 ## Rotation operators ##
 class Sigma:
@@ -100,9 +226,22 @@ class Sigma:
         self.matrix = matrix
 
     def __mul__(self, cubie):
+        ## integer orientations: a cyclic matrix adds its shift to the code ##
+        if '_code' in cubie.__dict__ and self.shift is not None:
+            return cubie._moved(cubie.x, cubie.y, cubie.z, self.shift)
         ## return the same Cubie but with different orientation (@ stands for matmul operation) ##
         return cubie.__class__(cubie.x, cubie.y, cubie.z, self.matrix @ cubie.orientation )
 
+    ## s when the matrix sends the k-th basis vector to the (k+s)-th one (X: 1, C: 1, A: 2), else None ##
+    @property
+    def shift(self):
+        try:
+            return self._shift
+        except AttributeError:
+            n = len(self.matrix)
+            self._shift = next((s for s in range(n) if np.array_equal(self.matrix, np.roll(np.eye(n), s, axis=0))), None)
+            return self._shift
+
     def __matmul__(self, other):
         ## composition between matrices ##
         return other.__class__(self.matrix@other.matrix)
@@ -164,28 +303,99 @@ class Permutations:
     def __repr__(self):
         return str(self.cycle1) + '\n' + str(self.cycle2)
 
+    ## convert the two cycles into a DensePermutation over range(n) ##
+    def dense(self, n=None):
+        if n is None: n = int(max(np.max(self.cycle1), np.max(self.cycle2))) + 1
+        image = np.arange(n)
+        image[np.asarray(self.cycle1, dtype=np.intp)] = self.cycle2
+        return DensePermutation(image)
+
     def __matmul__(self, other):
-        ###################################################
-        ##    convert the exchanges into a dictionary    ##
-        ## use the self.convert() function defined above ##
-        ###################################################
-        dic1 = self.convert()
-        dic2 = other.convert()
-        for key, value in dic1.items():
-            try: dic1[key] = dic2[value]
-            except: continue
-        for key, value in dic2.items():
-            if key not in dic1: dic1[key] = value
-        for key in dic1.copy():
-            if key == dic1[key]: dic1.pop(key)
-        A = np.array(list(dic1.items())).transpose()
-        try:
-            return Permutations(A[0],A[1])
-        ## when A == [] no elements are permuted              ##
-        ## in such case, return a [0] list                    ##
-        ## i.e. and identity permutation on the first element ##
-        except:
-            return Permutations([0])
+        #######################################################
+        ## compose the full image arrays of the permutations ##
+        ## and go back to the two-cycle notation             ##
+        #######################################################
+        n = int(max(np.max(self.cycle1), np.max(other.cycle1))) + 1
+        return (self.dense(n) @ other.dense(n)).to_cycles()
+
+
+class DensePermutation:
+    ## A permutation of range(n) given by its full image array:              ##
+    ## image[k] is the index whose element is moved to the k-th position,    ##
+    ## i.e. (P * v)[k] = v[image[k]], as for Permutations(cycle1, cycle2)    ##
+    ## where image[cycle1[i]] = cycle2[i]                                     ##
+    def __init__(self, image):
+        self.image = np.asarray(image, dtype=np.intp)
+
+    @classmethod
+    def identity(cls, n):
+        return cls(np.arange(n))
+
+    def __len__(self):
+        return len(self.image)
+
+    def __eq__(self, other):
+        return np.array_equal(self.image, other.image)
+
+    def __repr__(self):
+        return str(self.image)
+
+    ## action on a vector (its first n elements are permuted in place) ##
+    def __mul__(self, vector):
+        vector[:len(self.image)] = vector[self.image]
+        return vector
+
+    ## composition: (P1 @ P2) * v = P1 * (P2 * v) ##
+    def __matmul__(self, other):
+        if len(self) != len(other):
+            n = max(len(self), len(other))
+            return self.extend(n) @ other.extend(n)
+        return DensePermutation(other.image[self.image])
+
+    ## the same permutation over range(n), n >= len(self) ##
+    def extend(self, n):
+        return DensePermutation(np.concatenate((self.image, np.arange(len(self), n))))
+
+    def inverse(self):
+        inverse = np.empty_like(self.image)
+        inverse[self.image] = np.arange(len(self.image))
+        return DensePermutation(inverse)
+
+    ## integer (also negative) powers, by repeated squaring ##
+    def __pow__(self, k):
+        if k < 0: return self.inverse() ** (-k)
+        power, base = DensePermutation.identity(len(self)), self
+        while k:
+            if k & 1: power = power @ base
+            base = base @ base
+            k >>= 1
+        return power
+
+    ## disjoint cycles (fixed points excluded): each cycle lists k, image[k], image[image[k]], ... ##
+    def cycles(self):
+        visited = self.image == np.arange(len(self.image))
+        cycles = []
+        for start in np.flatnonzero(~visited):
+            if visited[start]: continue
+            cycle, k = [], start
+            while not visited[k]:
+                visited[k] = True
+                cycle.append(int(k))
+                k = self.image[k]
+            cycles.append(cycle)
+        return cycles
+
+    ## the order is the least common multiple of the lengths of the cycles ##
+    def order(self):
+        return int(np.lcm.reduce([len(c) for c in self.cycles()] + [1]))
+
+    ## two-cycle notation on the moved elements only ##
+    def to_cycles(self):
+        moved = np.flatnonzero(self.image != np.arange(len(self.image)))
+        ## when no elements are permuted, return a [0] list ##
+        ## i.e. an identity permutation on the first element ##
+        if len(moved) == 0: return Permutations([0])
+        return Permutations(moved, self.image[moved])
 
 
 
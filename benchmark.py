@@ -0,0 +1,128 @@
+###############################################################################
+# The copyright of this code, including all portions, content, design, text,  #
+# output and the selection and arrangement of the subroutines is owned by     #
+# the Authors and by CNR, unless otherwise indicated, and is protected by the #
+# provisions of the Italian Copyright law.                                    #
+#                                                                             #
+# All rights reserved. This software may not be reproduced or distributed, in #
+# whole or in part, without the prior written permission of the Authors.      #
+# However, reproduction and distribution, in whole or in part, by non-profit, #
+# research or educational institutions for their own use is permitted if      #
+# proper credit is given, with full citation, and copyright is acknowledged.  #
+# Any other reproduction or distribution, in whatever form and by whatever    #
+# media, is expressly prohibited without the prior written consent of the     #
+# Authors. For further information, please contact CNR.                       #
+# Contact person:           enrico.prati@cnr.it                               #
+#                                                                             #
+# Concept and development:  Sebastiano Corli, Lorenzo Moro, Enrico Prati      #
+# Year:                     2022                                              #
+# Istituto di Fotonica e Nanotecnologie - Consiglio Nazionale delle Ricerche  #
+###############################################################################
+
+from Rubik import *
+from vector_env import VectorRubiksEnv
+import argparse
+import itertools
+import platform
+import json
+import time
+
+
+#############
+## TIMINGS ##
+#############
+
+## Time fn (no arguments) in repeat samples of number calls each, after warmup   ##
+## calls. Every call is timed on its own, so that the latency percentiles are   ##
+## per call (each timing includes a perf_counter call, about 0.1 us); ops counts ##
+## the operations done by a call (e.g. the batch size)                          ##
+def measure(fn, number=100, repeat=20, warmup=10, ops=1):
+    for _ in range(warmup):
+        fn()
+    timings = np.empty(number * repeat)
+    clock = time.perf_counter
+    for i in range(number * repeat):
+        start = clock()
+        fn()
+        timings[i] = clock() - start
+    p50, p90, p99 = np.percentile(timings, [50, 90, 99])
+    return {'calls': number * repeat, 'ops_per_call': ops, 'ops_per_sec': ops / timings.mean(),
+            'mean': timings.mean(), 'min': timings.min(), 'p50': p50, 'p90': p90, 'p99': p99}
+
+
+################
+## BENCHMARKS ##
+################
+
+## name -> (fn, ops per call); the operands are built once, outside the timed calls. ##
+## Every case has its own operands, so that the work it measures does not depend on ##
+## the other cases run (e.g. is_solved always checks a solved Cube, 20 cubies)      ##
+def benchmarks(batch_sizes=(1, 64, 1024)):
+    R, U = RubiksGroup.move('R'), RubiksGroup.move('U')
+    sequence = [RubiksGroup.move(m) for m in ['R', 'U', "R'", "U'", 'F2', 'D', "L'", 'B']]
+    moved, compact, solved, reset = RubiksCube(), CompactRubiksCube(), RubiksCube(), RubiksCube()
+    cube, other = RubiksCube(), R * RubiksCube()
+    P1, P2 = R.Pe, U.Pe
+    cases = {'mul_object': (lambda: R * moved, 1),
+             'mul_compact': (lambda: R * compact, 1),
+             'matmul': (lambda: R @ U, 1),
+             'compose_multipleOperators_8': (lambda: RubiksGroup.compose_multipleOperators(sequence), 1),
+             'is_solved': (solved.is_solved, 1),
+             'eq': (lambda: cube == other, 1),
+             'reset': (reset.reset, 1),
+             'permutations_matmul': (lambda: P1 @ P2, 1)}
+    ## full scramble + observe loops: every step applies a move and rewrites the one-hot observations ##
+    for n in batch_sizes:
+        env = VectorRubiksEnv(n, n_actions=18, scramble_depth=20)
+        env.reset(seed=0)
+        actions = np.random.default_rng(0).integers(18, size=(64, n))
+        steps = itertools.count()
+        cases[f'env_step_{n}'] = (lambda env=env, actions=actions, steps=steps: env.step(actions[next(steps) % 64]), n)
+        env = VectorRubiksEnv(n, n_actions=18, scramble_depth=20)
+        cases[f'scramble_observe_{n}'] = (lambda env=env: env.reset(), n)
+        ## all the 18 successors of n states, as needed by value-iteration targets ##
+        batch = BatchedRubiksCube(n).scramble(20, np.random.default_rng(0))
+        out = np.empty((n, len(MOVES), STATE_SIZE), dtype=np.uint8)
+        cases[f'successors_{n}'] = (lambda batch=batch, out=out: batch.successors(out=out), n * len(MOVES))
+    return cases
+
+
+## run the benchmarks whose names contain one of the filters (all when None) ##
+def run(filters=None, quick=False, verbose=False):
+    results = {}
+    for name, (fn, ops) in benchmarks().items():
+        if filters and not any(f in name for f in filters): continue
+        results[name] = measure(fn, number=10 if quick else 100, repeat=5 if quick else 20,
+                                warmup=2 if quick else 10, ops=ops)
+        if verbose:
+            r = results[name]
+            print(f"{name:32s} {r['ops_per_sec']:14.1f} ops/s   p50 {1e6 * r['p50']:10.2f} us   "
+                  f"p99 {1e6 * r['p99']:10.2f} us", flush=True)
+    return {'machine': {'python': platform.python_version(), 'numpy': np.__version__,
+                        'platform': platform.platform(), 'processor': platform.processor()},
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'), 'results': results}
+
+
+## speedup of new over old (ratio of ops/sec) for the benchmarks of both reports ##
+def compare(old, new):
+    return {name: new['results'][name]['ops_per_sec'] / old['results'][name]['ops_per_sec']
+            for name in old['results'] if name in new['results']}
+
+
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the Cube operations and the environments")
+    parser.add_argument('output', nargs='?', help="JSON file for the results")
+    parser.add_argument('--filter', nargs='*', help="run only the benchmarks whose names contain these strings")
+    parser.add_argument('--quick', action='store_true', help="fewer calls per benchmark")
+    parser.add_argument('--baseline', help="JSON results to compare with")
+    args = parser.parse_args()
+    report = run(args.filter, args.quick, verbose=True)
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=1)
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            for name, speedup in compare(json.load(f), report).items():
+                print(f"{name:32s} x{speedup:.2f}")
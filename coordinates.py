@@ -0,0 +1,179 @@
+###############################################################################
+# The copyright of this code, including all portions, content, design, text,  #
+# output and the selection and arrangement of the subroutines is owned by     #
+# the Authors and by CNR, unless otherwise indicated, and is protected by the #
+# provisions of the Italian Copyright law.                                    #
+#                                                                             #
+# All rights reserved. This software may not be reproduced or distributed, in #
+# whole or in part, without the prior written permission of the Authors.      #
+# However, reproduction and distribution, in whole or in part, by non-profit, #
+# research or educational institutions for their own use is permitted if      #
+# proper credit is given, with full citation, and copyright is acknowledged.  #
+# Any other reproduction or distribution, in whatever form and by whatever    #
+# media, is expressly prohibited without the prior written consent of the     #
+# Authors. For further information, please contact CNR.                       #
+# Contact person:           enrico.prati@cnr.it                               #
+#                                                                             #
+# Concept and development:  Sebastiano Corli, Lorenzo Moro, Enrico Prati      #
+# Year:                     2022                                              #
+# Istituto di Fotonica e Nanotecnologie - Consiglio Nazionale delle Ricerche  #
+###############################################################################
+
+from Rubik import *
+from math import factorial
+
+
+##################
+## COMPACT KEYS ##
+##################
+
+## Every slot holds one of 24 (cubie, orientation) pairs, i.e. 5 bits:   ##
+## the 12 edge slots fill 60 bits and the 8 corner slots other 40 bits,  ##
+## so that a state is packed in two uint64 words or in a 100-bit integer ##
+_EDGE_SHIFTS = (5 * np.arange(12)).astype(np.uint64)
+_CORNER_SHIFTS = (5 * np.arange(8)).astype(np.uint64)
+
+
+## pack compact states (shape (..., 40)) into words of shape (..., 2) ##
+def pack(state):
+    state = np.asarray(state, dtype=np.uint64)
+    edges = (2 * state[..., EP] + state[..., EO]) << _EDGE_SHIFTS
+    corners = (3 * state[..., CP] + state[..., CO]) << _CORNER_SHIFTS
+    return np.stack((np.bitwise_or.reduce(edges, axis=-1), np.bitwise_or.reduce(corners, axis=-1)), axis=-1)
+
+
+## inverse of pack ##
+def unpack(words):
+    words = np.asarray(words, dtype=np.uint64)
+    edges = (words[..., 0:1] >> _EDGE_SHIFTS) & np.uint64(31)
+    corners = (words[..., 1:2] >> _CORNER_SHIFTS) & np.uint64(31)
+    return np.concatenate((edges // 2, edges % 2, corners // 3, corners % 3), axis=-1).astype(np.uint8)
+
+
+## hashable and canonical key of a single state: a (100-bit) python integer ##
+def state_key(state):
+    edges, corners = pack(state).tolist()
+    return corners << 60 | edges
+
+
+## inverse of state_key ##
+def key_state(key):
+    return unpack([key & (2**60 - 1), key >> 60])
+
+
+## keys of a batch of states (shape (N, 40)), as a list of python integers ##
+def state_keys(states):
+    return [corners << 60 | edges for edges, corners in pack(states).tolist()]
+
+
+## inverse of state_keys: the (N, 40) matrix of the states of a list of keys ##
+def key_states(keys):
+    words = np.array([[key & (2**60 - 1), key >> 60] for key in keys], dtype=np.uint64).reshape(-1, 2)
+    return unpack(words)
+
+
+
+
+#################
+## COORDINATES ##
+#################
+
+N_CORNER_PERMUTATIONS = factorial(8)
+N_CORNER_TWISTS = 3**7
+N_EDGE_PERMUTATIONS = factorial(12)
+N_EDGE_FLIPS = 2**11
+## the parities of edge and corner permutations are equal in reachable states ##
+N_STATES = N_CORNER_PERMUTATIONS * N_CORNER_TWISTS * N_EDGE_PERMUTATIONS // 2 * N_EDGE_FLIPS
+
+_FACTORIALS = np.array([factorial(k) for k in range(13)], dtype=np.int64)
+
+
+## Lehmer code of permutations of range(n) (shape (..., n)): ##
+## digits[i] counts the elements after perm[i] smaller than it ##
+def lehmer_code(perm):
+    perm = np.asarray(perm, dtype=np.int64)
+    after = np.triu(np.ones((perm.shape[-1],) * 2, dtype=bool), 1)
+    return ((perm[..., None, :] < perm[..., :, None]) & after).sum(axis=-1)
+
+
+## lexicographic rank of permutations of range(n), in [0, n!) ##
+def rank_permutation(perm):
+    n = np.shape(perm)[-1]
+    return lehmer_code(perm) @ _FACTORIALS[n - 1::-1]
+
+
+## permutations of range(n) given their lexicographic ranks ##
+def unrank_permutation(rank, n):
+    rank = np.array(rank, dtype=np.int64)
+    available = np.ones(rank.shape + (n,), dtype=bool)
+    perm = np.empty(rank.shape + (n,), dtype=np.uint8)
+    for i in range(n):
+        digit, rank = np.divmod(rank, _FACTORIALS[n - 1 - i])
+        ## the digit-th element still available ##
+        chosen = np.argmax(np.cumsum(available, axis=-1) > digit[..., None], axis=-1)
+        perm[..., i] = chosen
+        np.put_along_axis(available, chosen[..., None], False, axis=-1)
+    return perm
+
+
+## parity of permutations (0 even, 1 odd) ##
+def permutation_parity(perm):
+    return lehmer_code(perm).sum(axis=-1) % 2
+
+
+## orientations are ranked by their first n-1 digits (base mod) ##
+## the last one is fixed by the total orientation being null     ##
+def rank_orientation(orientation, mod):
+    orientation = np.asarray(orientation, dtype=np.int64)
+    n = orientation.shape[-1]
+    return orientation[..., :-1] @ mod ** np.arange(n - 2, -1, -1, dtype=np.int64)
+
+
+def unrank_orientation(rank, n, mod):
+    rank = np.asarray(rank, dtype=np.int64)
+    digits = (rank[..., None] // mod ** np.arange(n - 2, -1, -1, dtype=np.int64)) % mod
+    return np.concatenate((digits, -digits.sum(axis=-1, keepdims=True) % mod), axis=-1).astype(np.uint8)
+
+
+## coordinates of compact states (shape (..., 40)) ##
+def corner_permutation_coord(state):
+    return rank_permutation(np.asarray(state)[..., CP])
+
+
+def corner_twist_coord(state):
+    return rank_orientation(np.asarray(state)[..., CO], 3)
+
+
+def edge_permutation_coord(state):
+    return rank_permutation(np.asarray(state)[..., EP])
+
+
+def edge_flip_coord(state):
+    return rank_orientation(np.asarray(state)[..., EO], 2)
+
+
+###################
+## PERFECT INDEX ##
+###################
+
+## index of a reachable state in [0, N_STATES) ##
+def state_index(state):
+    state = np.asarray(state)
+    index = int(corner_permutation_coord(state))
+    index = index * N_CORNER_TWISTS + int(corner_twist_coord(state))
+    ## half of the edge permutations are excluded by the parity constraint ##
+    index = index * (N_EDGE_PERMUTATIONS // 2) + int(edge_permutation_coord(state)) // 2
+    return index * N_EDGE_FLIPS + int(edge_flip_coord(state))
+
+
+## reachable state of given index ##
+def index_state(index):
+    index, eo = divmod(index, N_EDGE_FLIPS)
+    index, ep = divmod(index, N_EDGE_PERMUTATIONS // 2)
+    cp, co = divmod(index, N_CORNER_TWISTS)
+    corners = unrank_permutation(cp, 8)
+    edges = unrank_permutation(2 * ep, 12)
+    ## the lowest digit of the rank swaps the last two edges, i.e. the parity ##
+    if permutation_parity(edges) != permutation_parity(corners):
+        edges = unrank_permutation(2 * ep + 1, 12)
+    return np.concatenate((edges, unrank_orientation(eo, 12, 2), corners, unrank_orientation(co, 8, 3)))
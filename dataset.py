@@ -0,0 +1,215 @@
+###############################################################################
+# The copyright of this code, including all portions, content, design, text,  #
+# output and the selection and arrangement of the subroutines is owned by     #
+# the Authors and by CNR, unless otherwise indicated, and is protected by the #
+# provisions of the Italian Copyright law.                                    #
+#                                                                             #
+# All rights reserved. This software may not be reproduced or distributed, in #
+# whole or in part, without the prior written permission of the Authors.      #
+# However, reproduction and distribution, in whole or in part, by non-profit, #
+# research or educational institutions for their own use is permitted if      #
+# proper credit is given, with full citation, and copyright is acknowledged.  #
+# Any other reproduction or distribution, in whatever form and by whatever    #
+# media, is expressly prohibited without the prior written consent of the     #
+# Authors. For further information, please contact CNR.                       #
+# Contact person:           enrico.prati@cnr.it                               #
+#                                                                             #
+# Concept and development:  Sebastiano Corli, Lorenzo Moro, Enrico Prati      #
+# Year:                     2022                                              #
+# Istituto di Fotonica e Nanotecnologie - Consiglio Nazionale delle Ricerche  #
+###############################################################################
+
+from Rubik import *
+from solver import ALLOWED
+import argparse
+import json
+import os
+
+
+#############
+## RECORDS ##
+#############
+
+## Every sample is a fixed-size record: the compact state, the number of     ##
+## moves of the random walk that produced it, the last move (index in MOVES) ##
+## and, for labelled datasets, a distance label (e.g. from a solver or a PDB) ##
+RECORD_FIELDS = [('state', np.uint8, (STATE_SIZE,)), ('depth', np.uint8), ('last_move', np.uint8)]
+
+
+def record_dtype(labelled=False):
+    return np.dtype(RECORD_FIELDS + ([('distance', np.uint8)] if labelled else []))
+
+
+##################
+## RANDOM WALKS ##
+##################
+
+## n_walks random walks from the solved state, advanced together: yields the (n_walks,) ##
+## records of every step, from depth 1 to max_depth. With avoid_redundant the walks    ##
+## never turn the same face twice in a row, nor opposite faces in both orders           ##
+def random_walks(n_walks, max_depth, rng=None, avoid_redundant=True, labelled=False):
+    rng = np.random.default_rng(rng)
+    cubes = BatchedRubiksCube(n_walks)
+    last = np.full(n_walks, len(MOVES))
+    for depth in range(1, max_depth + 1):
+        moves = rng.integers(len(MOVES), size=n_walks)
+        if avoid_redundant:
+            ## redraw the moves not allowed after the last ones ##
+            redraw = ~ALLOWED[last, moves]
+            while redraw.any():
+                moves[redraw] = rng.integers(len(MOVES), size=redraw.sum())
+                redraw = ~ALLOWED[last, moves]
+        cubes.step(moves)
+        last = moves
+        records = np.zeros(n_walks, dtype=record_dtype(labelled))
+        records['state'], records['depth'], records['last_move'] = cubes.state, depth, moves
+        yield records
+
+
+## n_samples records from walks of max_depth moves, in blocks of n_walks * max_depth at most; ##
+## label maps (N, 40) states to distances, e.g. a PatternDatabase or a solver               ##
+def generate(n_samples, max_depth, n_walks=4096, rng=None, avoid_redundant=True, label=None):
+    rng = np.random.default_rng(rng)
+    while n_samples > 0:
+        n = min(n_walks, -(-n_samples // max_depth))
+        for records in random_walks(n, max_depth, rng, avoid_redundant, label is not None):
+            records = records[:n_samples]
+            if label is not None: records['distance'] = label(records['state'])
+            n_samples -= len(records)
+            yield records
+            if n_samples == 0: return
+
+
+
+
+##################
+## SHARD WRITER ##
+##################
+class ShardWriter:
+    ## Records are buffered in a preallocated array and written as .npy shards ##
+    ## of shard_size records (the last one may be shorter) in directory, so the ##
+    ## memory used is constant. index.json lists the shards and their lengths  ##
+    def __init__(self, directory, shard_size=2**20, labelled=False, meta=None):
+        self.directory = str(directory)
+        self.shard_size = shard_size
+        self.dtype = record_dtype(labelled)
+        self.meta = dict(meta or {})
+        self.shards = []
+        self._buffer = np.zeros(shard_size, dtype=self.dtype)
+        self._filled = 0
+        os.makedirs(self.directory, exist_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return sum(n for _, n in self.shards) + self._filled
+
+    def write(self, records):
+        if records.dtype != self.dtype:
+            raise TypeError(f"Records of dtype {records.dtype}, {self.dtype} expected")
+        while len(records):
+            n = min(len(records), self.shard_size - self._filled)
+            self._buffer[self._filled:self._filled + n] = records[:n]
+            self._filled += n
+            records = records[n:]
+            if self._filled == self.shard_size: self.flush()
+
+    def flush(self):
+        if self._filled == 0: return
+        name = f"shard-{len(self.shards):05d}.npy"
+        np.save(os.path.join(self.directory, name), self._buffer[:self._filled])
+        self.shards.append((name, self._filled))
+        self._filled = 0
+
+    def close(self):
+        self.flush()
+        with open(os.path.join(self.directory, 'index.json'), 'w') as f:
+            json.dump({'fields': list(self.dtype.names), 'shards': self.shards, 'meta': self.meta}, f)
+
+
+## generate a dataset and write it in directory, returning the number of records ##
+def write_dataset(directory, n_samples, max_depth, shard_size=2**20, n_walks=4096, seed=None,
+                  avoid_redundant=True, label=None, verbose=False):
+    meta = {'n_samples': n_samples, 'max_depth': max_depth, 'seed': seed, 'avoid_redundant': avoid_redundant}
+    with ShardWriter(directory, shard_size, label is not None, meta) as writer:
+        for records in generate(n_samples, max_depth, n_walks, seed, avoid_redundant, label):
+            writer.write(records)
+            if verbose and len(writer) % shard_size < len(records):
+                print(f"{len(writer)} / {n_samples} records", flush=True)
+    return len(writer)
+
+
+
+
+####################
+## DATASET READER ##
+####################
+class ShardReader:
+    ## The shards listed in index.json are memory-mapped (read only): a batch ##
+    ## reads only its own records, and the page cache is shared among the     ##
+    ## processes of a data loader                                             ##
+    def __init__(self, directory, mmap=True):
+        self.directory = str(directory)
+        with open(os.path.join(self.directory, 'index.json')) as f:
+            index = json.load(f)
+        self.fields = index['fields']
+        self.meta = index['meta']
+        self.shards = [np.load(os.path.join(self.directory, name), mmap_mode='r' if mmap else None)
+                       for name, _ in index['shards']]
+        for shard, (name, n) in zip(self.shards, index['shards']):
+            if len(shard) != n:
+                raise TypeError(f"{name} holds {len(shard)} records, {n} expected")
+        ## global index of the first record of every shard ##
+        self.offsets = np.cumsum([0] + [len(shard) for shard in self.shards])
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    def __repr__(self):
+        return f"ShardReader({self.directory!r}, {len(self)} records in {len(self.shards)} shards)"
+
+    ## records of the given global indices, as a dict of contiguous arrays (one per field) ##
+    def __getitem__(self, indices):
+        indices = np.asarray(indices, dtype=np.int64)
+        if indices.ndim == 0: return {k: v[0] for k, v in self[indices[None]].items()}
+        if len(indices) and (indices.min() < -len(self) or indices.max() >= len(self)):
+            raise IndexError(f"Index out of range for {len(self)} records")
+        indices = indices % max(len(self), 1)
+        out = np.empty(len(indices), dtype=self.shards[0].dtype if self.shards else record_dtype())
+        shards = np.searchsorted(self.offsets, indices, side='right') - 1
+        ## one sorted gather per shard: mostly sequential reads of the mapped files ##
+        for s in np.unique(shards):
+            rows = np.flatnonzero(shards == s)
+            local = indices[rows] - self.offsets[s]
+            order = np.argsort(local, kind='stable')
+            out[rows[order]] = self.shards[s][local[order]]
+        return {field: np.ascontiguousarray(out[field]) for field in self.fields}
+
+    ## random minibatch of batch_size records (with replacement) ##
+    def sample(self, batch_size, rng=None):
+        rng = np.random.default_rng(rng)
+        return self[rng.integers(len(self), size=batch_size)]
+
+    ## an epoch of minibatches, shuffled (without replacement) unless shuffle=False ##
+    def batches(self, batch_size, shuffle=True, rng=None, drop_last=False):
+        indices = np.random.default_rng(rng).permutation(len(self)) if shuffle else np.arange(len(self))
+        stop = len(self) - len(self) % batch_size if drop_last else len(self)
+        for i in range(0, stop, batch_size):
+            yield self[indices[i:i + batch_size]]
+
+
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Write a dataset of scrambled states as .npy shards")
+    parser.add_argument('directory')
+    parser.add_argument('n_samples', type=int)
+    parser.add_argument('--max-depth', type=int, default=30)
+    parser.add_argument('--shard-size', type=int, default=2**20)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+    write_dataset(args.directory, args.n_samples, args.max_depth, args.shard_size, seed=args.seed, verbose=True)
@@ -0,0 +1,154 @@
+###############################################################################
+# The copyright of this code, including all portions, content, design, text,  #
+# output and the selection and arrangement of the subroutines is owned by     #
+# the Authors and by CNR, unless otherwise indicated, and is protected by the #
+# provisions of the Italian Copyright law.                                    #
+#                                                                             #
+# All rights reserved. This software may not be reproduced or distributed, in #
+# whole or in part, without the prior written permission of the Authors.      #
+# However, reproduction and distribution, in whole or in part, by non-profit, #
+# research or educational institutions for their own use is permitted if      #
+# proper credit is given, with full citation, and copyright is acknowledged.  #
+# Any other reproduction or distribution, in whatever form and by whatever    #
+# media, is expressly prohibited without the prior written consent of the     #
+# Authors. For further information, please contact CNR.                       #
+# Contact person:           enrico.prati@cnr.it                               #
+#                                                                             #
+# Concept and development:  Sebastiano Corli, Lorenzo Moro, Enrico Prati      #
+# Year:                     2022                                              #
+# Istituto di Fotonica e Nanotecnologie - Consiglio Nazionale delle Ricerche  #
+###############################################################################
+
+from Rubik import *
+
+## gymnasium is optional: without it the environment keeps the same API ##
+## (reset/step signatures and return values), but exposes no spaces     ##
+try:
+    import gymnasium as gym
+    from gymnasium import spaces
+except ImportError:
+    gym = None
+
+
+##########################
+## OBSERVATION ENCODING ##
+##########################
+
+## Every slot is encoded by a one-hot vector over (cubie, orientation) pairs: ##
+## 12 edges x 2 flips = 24 entries per edge slot, 8 corners x 3 twists = 24   ##
+## entries per corner slot, i.e. 20 x 24 = 480 entries in total               ##
+ONE_HOT_SIZE = 480
+_EDGE_OFFSETS = np.arange(12) * 24
+_CORNER_OFFSETS = 12 * 24 + np.arange(8) * 24
+
+
+## indices of the 20 non-null entries of the one-hot encoding of compact states ##
+## state can be a single (40,) vector or a (N, 40) matrix of states              ##
+def one_hot_indices(state):
+    state = np.asarray(state, dtype=np.intp)
+    edges = _EDGE_OFFSETS + 2 * state[..., EP] + state[..., EO]
+    corners = _CORNER_OFFSETS + 3 * state[..., CP] + state[..., CO]
+    return np.concatenate((edges, corners), axis=-1)
+
+
+## one-hot encoding of compact states, written in out when given ##
+def one_hot(state, out=None, dtype=np.float32):
+    indices = one_hot_indices(state)
+    if out is None:
+        out = np.zeros(indices.shape[:-1] + (ONE_HOT_SIZE,), dtype=dtype)
+    else:
+        out[...] = 0
+    np.put_along_axis(out, indices, 1, axis=-1)
+    return out
+
+
+###################
+## ACTION SPACES ##
+###################
+
+## quarter turns only (12 actions) or quarter and half turns (18 actions) ##
+QUARTER_TURNS = [m for m in MOVES if not m.endswith('2')]
+ACTION_SETS = {12: QUARTER_TURNS, 18: MOVES}
+
+
+## macro-actions follow the face turns: macros is a list of names registered with ##
+## RubiksGroup.register_macro, or a dict {name: definition} registered here (a    ##
+## name already bound to another operator raises: unregister it first)            ##
+def macro_names(macros):
+    if isinstance(macros, dict):
+        for name, definition in macros.items():
+            RubiksGroup.register_macro(name, definition)
+    names = list(macros)
+    for name in names:
+        RubiksGroup.macro(name)
+    return names
+
+
+#########################
+## RUBIK'S ENVIRONMENT ##
+#########################
+class RubiksEnv(gym.Env if gym is not None else object):
+    metadata = {'render_modes': []}
+
+    def __init__(self, n_actions=12, scramble_depth=20, max_steps=100, solved_reward=1.0, step_reward=0.0,
+                 obs_dtype=np.float32, copy_obs=True, macros=()):
+        if n_actions not in ACTION_SETS:
+            raise TypeError(f"n_actions must be one of {[*ACTION_SETS]}, not {n_actions}")
+        ## names of the allowed actions (face turns, then macros) and their stacked tables: ##
+        ## scrambles use the n_actions face turns only                                      ##
+        self.n_turns = n_actions
+        self.actions = ACTION_SETS[n_actions] + macro_names(macros)
+        self._src, self._delta = RubiksGroup.action_tables(self.actions)
+        ## the scramble depth is either fixed or drawn uniformly from a (min, max) range ##
+        self.scramble_depth = scramble_depth
+        self.max_steps = max_steps
+        self.solved_reward = solved_reward
+        self.step_reward = step_reward
+        self.cube = CompactRubiksCube()
+        self.steps = 0
+        self.np_random = np.random.default_rng()
+        ## the observation buffer is allocated once and rewritten in place at every step: ##
+        ## reset() and step() return copies of it, as the gymnasium API requires; with  ##
+        ## copy_obs=False they return the buffer itself (no allocation per step), which ##
+        ## must then be copied if it has to be stored (e.g. in a replay buffer)         ##
+        self.copy_obs = copy_obs
+        self._obs = np.zeros(ONE_HOT_SIZE, dtype=obs_dtype)
+        self._hot = one_hot_indices(self.cube.state)
+        self._obs[self._hot] = 1
+        if gym is not None:
+            self.action_space = spaces.Discrete(len(self.actions))
+            self.observation_space = spaces.Box(0, 1, shape=(ONE_HOT_SIZE,), dtype=obs_dtype)
+
+    ## rewrite only the entries of the buffer that change ##
+    def _observe(self):
+        self._obs[self._hot] = 0
+        self._hot = one_hot_indices(self.cube.state)
+        self._obs[self._hot] = 1
+        return self._obs.copy() if self.copy_obs else self._obs
+
+    def _apply(self, action):
+        self.cube.state = (self.cube.state[self._src[action]] + self._delta[action]) % MODULI
+
+    ## options may override the scramble depth with {'scramble_depth': d} ##
+    def reset(self, seed=None, options=None):
+        if seed is not None:
+            self.np_random = np.random.default_rng(seed)
+        depth = (options or {}).get('scramble_depth', self.scramble_depth)
+        if np.ndim(depth) == 0:
+            depth = int(depth)
+        else:
+            depth = int(self.np_random.integers(depth[0], depth[1] + 1))
+        self.cube.reset()
+        for action in self.np_random.integers(self.n_turns, size=depth):
+            self._apply(action)
+        self.steps = 0
+        return self._observe(), {'scramble_depth': depth}
+
+    ## returns observation, reward, terminated, truncated, info ##
+    def step(self, action):
+        self._apply(action)
+        self.steps += 1
+        solved = bool(self.cube.is_solved())
+        reward = self.solved_reward if solved else self.step_reward
+        truncated = not solved and self.steps >= self.max_steps
+        return self._observe(), reward, solved, truncated, {}
@@ -0,0 +1,164 @@
+###############################################################################
+# The copyright of this code, including all portions, content, design, text,  #
+# output and the selection and arrangement of the subroutines is owned by     #
+# the Authors and by CNR, unless otherwise indicated, and is protected by the #
+# provisions of the Italian Copyright law.                                    #
+#                                                                             #
+# All rights reserved. This software may not be reproduced or distributed, in #
+# whole or in part, without the prior written permission of the Authors.      #
+# However, reproduction and distribution, in whole or in part, by non-profit, #
+# research or educational institutions for their own use is permitted if      #
+# proper credit is given, with full citation, and copyright is acknowledged.  #
+# Any other reproduction or distribution, in whatever form and by whatever    #
+# media, is expressly prohibited without the prior written consent of the     #
+# Authors. For further information, please contact CNR.                       #
+# Contact person:           enrico.prati@cnr.it                               #
+#                                                                             #
+# Concept and development:  Sebastiano Corli, Lorenzo Moro, Enrico Prati      #
+# Year:                     2022                                              #
+# Istituto di Fotonica e Nanotecnologie - Consiglio Nazionale delle Ricerche  #
+###############################################################################
+
+from Rubik import *
+from collections import OrderedDict
+import re
+
+
+#############
+## PARSING ##
+#############
+
+## a face letter followed by ' (anticlockwise), 2 (half turn), or both (2' is the same as 2) ##
+_TOKEN = re.compile(r"\s*([UDLRFB])(2'|'2|2|')?\s*")
+## quarter turns of the suffixes, mod 4 ##
+_QUARTERS = {'': 1, "'": 3, '2': 2, "2'": 2, "'2": 2}
+_SUFFIXES = {1: '', 2: '2', 3: "'"}
+
+
+## list of move names from a string ("R U R' U' R2", also without spaces) or an iterable of names ##
+def parse(sequence):
+    if isinstance(sequence, str):
+        tokens, position = [], 0
+        while position < len(sequence):
+            match = _TOKEN.match(sequence, position)
+            if match is None:
+                raise TypeError(f"Cannot parse {sequence[position:]!r}: allowed moves are {MOVES}")
+            tokens.append(match.group(1) + _SUFFIXES[_QUARTERS[match.group(2) or '']])
+            position = match.end()
+        return tokens
+    sequence = list(sequence)
+    for name in sequence:
+        if name not in MOVES:
+            raise TypeError(f"{name} is not a face turn: allowed moves are {MOVES}")
+    return sequence
+
+
+####################
+## SIMPLIFICATION ##
+####################
+
+## Shortest equivalent sequence: turns of the same face are merged (and     ##
+## dropped when they cancel), also across a turn of the opposite face, which ##
+## commutes; pairs of opposite faces are then sorted in the order of FACES  ##
+## (U before D, L before R, F before B), as the move pruning of the solvers  ##
+def simplify(sequence):
+    turns = []
+    for name in parse(sequence):
+        face, quarters = FACES.index(name[0]), _QUARTERS[name[1:]]
+        if turns and turns[-1][0] == face:
+            i = len(turns) - 1
+        elif len(turns) >= 2 and turns[-1][0] == face ^ 1 and turns[-2][0] == face:
+            i = len(turns) - 2
+        else:
+            turns.append([face, quarters])
+            continue
+        turns[i][1] = (turns[i][1] + quarters) % 4
+        if turns[i][1] == 0: del turns[i]
+    for i in range(len(turns) - 1):
+        if turns[i][0] == turns[i + 1][0] ^ 1 and turns[i][0] > turns[i + 1][0]:
+            turns[i], turns[i + 1] = turns[i + 1], turns[i]
+    return [FACES[face] + _SUFFIXES[quarters] for face, quarters in turns]
+
+
+###############
+## COMPILING ##
+###############
+
+## Single operator acting as the sequence (applied left to right): since ##
+## (A @ B) * Cube == A * (B * Cube), the operators are composed in the   ##
+## reverse order. The identity is returned for empty sequences. When a   ##
+## cache is given (or enabled with enable_cache) it is looked up first   ##
+def compile_sequence(sequence, simplified=True, cache=None):
+    sequence = simplify(sequence) if simplified else parse(sequence)
+    cache = cache if cache is not None else _CACHE
+    if cache is not None: return cache.get(sequence)
+    return _compose(sequence)
+
+
+def _compose(sequence):
+    if not sequence: return RubiksGroup.identity()
+    return RubiksGroup.compose_multipleOperators([RubiksGroup.move(name) for name in reversed(sequence)])
+
+
+###########
+## CACHE ##
+###########
+class OperatorCache:
+    ## Composed operators memoized by their simplified move sequence, with at ##
+    ## most maxsize entries: the least recently used one is evicted first.   ##
+    ## The cached operators are shared, and must not be modified             ##
+    def __init__(self, maxsize=4096):
+        if maxsize < 1:
+            raise TypeError(f"maxsize must be positive, not {maxsize}")
+        self.maxsize = maxsize
+        self._operators = OrderedDict()
+        self.hits = self.misses = self.evictions = 0
+
+    def __len__(self):
+        return len(self._operators)
+
+    def __contains__(self, sequence):
+        return tuple(simplify(sequence)) in self._operators
+
+    def __repr__(self):
+        return f"OperatorCache({self.stats()})"
+
+    ## operator of the sequence, composed on a miss ##
+    def get(self, sequence):
+        key = tuple(simplify(sequence))
+        try:
+            operator = self._operators[key]
+        except KeyError:
+            self.misses += 1
+            operator = self._operators[key] = _compose(list(key))
+            if len(self._operators) > self.maxsize:
+                self._operators.popitem(last=False)
+                self.evictions += 1
+            return operator
+        self.hits += 1
+        self._operators.move_to_end(key)
+        return operator
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'size': len(self), 'maxsize': self.maxsize, 'hit_rate': self.hits / lookups if lookups else 0.}
+
+    def clear(self):
+        self._operators.clear()
+        self.hits = self.misses = self.evictions = 0
+
+
+## the cache used by compile_sequence by default: None (disabled) unless enabled ##
+_CACHE = None
+
+
+def enable_cache(maxsize=4096):
+    global _CACHE
+    _CACHE = OperatorCache(maxsize)
+    return _CACHE
+
+
+def disable_cache():
+    global _CACHE
+    _CACHE = None
@@ -0,0 +1,285 @@
+###############################################################################
+# The copyright of this code, including all portions, content, design, text,  #
+# output and the selection and arrangement of the subroutines is owned by     #
+# the Authors and by CNR, unless otherwise indicated, and is protected by the #
+# provisions of the Italian Copyright law.                                    #
+#                                                                             #
+# All rights reserved. This software may not be reproduced or distributed, in #
+# whole or in part, without the prior written permission of the Authors.      #
+# However, reproduction and distribution, in whole or in part, by non-profit, #
+# research or educational institutions for their own use is permitted if      #
+# proper credit is given, with full citation, and copyright is acknowledged.  #
+# Any other reproduction or distribution, in whatever form and by whatever    #
+# media, is expressly prohibited without the prior written consent of the     #
+# Authors. For further information, please contact CNR.                       #
+# Contact person:           enrico.prati@cnr.it                               #
+#                                                                             #
+# Concept and development:  Sebastiano Corli, Lorenzo Moro, Enrico Prati      #
+# Year:                     2022                                              #
+# Istituto di Fotonica e Nanotecnologie - Consiglio Nazionale delle Ricerche  #
+###############################################################################
+
+from Rubik import *
+from math import perm as n_arrangements
+import argparse
+import json
+import os
+
+
+#######################
+## CUBIE TRANSITIONS ##
+#######################
+
+## A tracked cubie is described by its position p = slot * mod + orientation ##
+## (mod = 2 for edges, 3 for corners), i.e. 24 values for both kinds.       ##
+## transitions[m, p] is the position reached from p by the m-th face turn.  ##
+def cubie_transitions():
+    src, delta = RubiksGroup.move_tables()
+    edges = np.empty((len(MOVES), 24), dtype=np.intp)
+    corners = np.empty((len(MOVES), 24), dtype=np.intp)
+    for m in range(len(MOVES)):
+        ## the content of slot src[j] lands in slot j ##
+        for j in range(12):
+            p = src[m, j]
+            for f in range(2): edges[m, 2 * p + f] = 2 * j + (f + delta[m, 12 + j]) % 2
+        for j in range(8):
+            p = src[m, 24 + j] - 24
+            for t in range(3): corners[m, 3 * p + t] = 3 * j + (t + delta[m, 32 + j]) % 3
+    return edges, corners
+
+
+######################
+## PATTERN INDEXING ##
+######################
+
+## bit tricks on the sets of used slots (12-bit masks): ##
+## number of used slots, and position of the d-th free one ##
+_POPCOUNT = np.array([bin(mask).count('1') for mask in range(2**12)], dtype=np.intp)
+_SELECT = np.array([[([j for j in range(12) if not mask >> j & 1] + [0] * 12)[d] for d in range(12)]
+                    for mask in range(2**12)], dtype=np.intp)
+
+class _Part:
+    ## k tracked cubies of one kind (n slots, orientations mod mod):      ##
+    ## index = arrangement * n_orientations + orientation, where           ##
+    ## arrangement ranks their slots (k-arrangements of n) and orientation ##
+    ## their orientations in base mod; the last orientation is left out    ##
+    ## (k' = k - 1) when all the cubies of the kind are tracked            ##
+    def __init__(self, cubies, n, mod):
+        self.cubies = np.array(sorted(cubies), dtype=np.intp)
+        self.n, self.mod, self.k = n, mod, len(self.cubies)
+        self.free_orientations = self.k - 1 if self.k == n else self.k
+        self.weights = np.array([n_arrangements(n - 1 - i, self.k - 1 - i) for i in range(self.k)], dtype=np.intp)
+        self.ori_weights = mod ** np.arange(self.free_orientations - 1, -1, -1, dtype=np.intp)
+        self.n_arrangements = n_arrangements(n, self.k)
+        self.n_orientations = mod ** self.free_orientations
+        self.size = self.n_arrangements * self.n_orientations
+
+    ## slots (k, ...) <-> arrangement ranks (...)                          ##
+    ## digit i counts the slots smaller than slots[i] not used before it ##
+    def encode_slots(self, slots):
+        used = np.zeros(slots.shape[1:], dtype=np.intp)
+        rank = np.zeros(slots.shape[1:], dtype=np.intp)
+        for i in range(self.k):
+            bit = 1 << slots[i]
+            rank += (slots[i] - _POPCOUNT[used & (bit - 1)]) * self.weights[i]
+            used |= bit
+        return rank
+
+    def decode_slots(self, rank):
+        used = np.zeros(rank.shape, dtype=np.intp)
+        slots = np.empty((self.k,) + rank.shape, dtype=np.intp)
+        for i in range(self.k):
+            digit, rank = np.divmod(rank, self.weights[i])
+            ## the digit-th slot still free ##
+            slots[i] = _SELECT[used, digit]
+            used |= 1 << slots[i]
+        return slots
+
+    ## orientations (k, ...) <-> orientation ranks (...) ##
+    def encode_orientations(self, oris):
+        rank = np.zeros(oris.shape[1:], dtype=np.intp)
+        for i in range(self.free_orientations):
+            rank += oris[i] * self.ori_weights[i]
+        return rank
+
+    def decode_orientations(self, rank):
+        oris = (rank // self.ori_weights.reshape((-1,) + (1,) * np.ndim(rank))) % self.mod
+        if self.free_orientations < self.k:
+            oris = np.concatenate((oris, -oris.sum(axis=0, keepdims=True) % self.mod))
+        return oris
+
+    ## positions (..., k) <-> indices (...) ##
+    def encode(self, positions):
+        slots, oris = np.divmod(np.moveaxis(positions, -1, 0), self.mod)
+        return self.encode_slots(slots) * self.n_orientations + self.encode_orientations(oris)
+
+    def decode(self, indices):
+        arrangement, orientation = np.divmod(np.asarray(indices, dtype=np.intp), self.n_orientations)
+        positions = self.decode_slots(arrangement) * self.mod + self.decode_orientations(orientation)
+        return np.moveaxis(positions, 0, -1)
+
+    ## positions (..., k) of the tracked cubies in compact states (..., 40) ##
+    def positions(self, state, permutation, orientation):
+        state = np.asarray(state, dtype=np.intp)
+        perm, ori = state[..., permutation], state[..., orientation]
+        ## slot of every cubie: inverse of the permutation ##
+        slots = np.argsort(perm, axis=-1)[..., self.cubies]
+        return slots * self.mod + np.take_along_axis(ori, slots, axis=-1)
+
+    ## Move tables on the indices. A face turn moves the slots independently  ##
+    ## of the orientations, and adds to the orientation of every cubie an    ##
+    ## offset which only depends on its new slot. Hence, for the m-th move:  ##
+    ## arrangement -> arrangements[m, arrangement]                            ##
+    ## orientation -> additions[orientation, offsets[m, arrangement]]         ##
+    def move_tables(self, transitions):
+        slots = self.decode_slots(np.arange(self.n_arrangements))
+        arrangements = np.empty((len(transitions), self.n_arrangements), dtype=np.int32)
+        offsets = np.empty((len(transitions), self.n_arrangements), dtype=np.int32)
+        for m, table in enumerate(transitions):
+            new_slots, new_oris = np.divmod(table[slots * self.mod], self.mod)
+            arrangements[m] = self.encode_slots(new_slots)
+            offsets[m] = self.encode_orientations(new_oris)
+        ## digit-wise addition (mod mod) of two orientation ranks ##
+        oris = self.decode_orientations(np.arange(self.n_orientations))
+        additions = self.encode_orientations((oris[:, :, None] + oris[:, None, :]) % self.mod).astype(np.int32)
+        return arrangements, offsets, additions
+
+    ## indices of the successors (by the m-th move) of the given indices ##
+    def successors(self, tables, m, arrangement, orientation):
+        arrangements, offsets, additions = tables
+        return arrangements[m][arrangement].astype(np.intp) * self.n_orientations + \
+            additions[orientation, offsets[m][arrangement]]
+
+
+
+
+######################
+## PATTERN DATABASE ##
+######################
+class PatternDatabase:
+    ## Distances to the solved pattern of the tracked edges and corners, ##
+    ## stored as packed 4-bit values (two entries per byte)               ##
+    def __init__(self, edges=(), corners=(), data=None):
+        self.edges, self.corners = list(map(int, edges)), list(map(int, corners))
+        self._edge_part = _Part(self.edges, 12, 2)
+        self._corner_part = _Part(self.corners, 8, 3)
+        self.size = self._edge_part.size * self._corner_part.size
+        self.data = data
+
+    def __len__(self):
+        return self.size
+
+    def __repr__(self):
+        return f"PatternDatabase(edges={self.edges}, corners={self.corners}, size={self.size})"
+
+    ## positions (..., k_edges + k_corners) <-> indices (...) ##
+    def encode(self, positions):
+        k = self._edge_part.k
+        return self._edge_part.encode(positions[..., :k]) * self._corner_part.size + \
+            self._corner_part.encode(positions[..., k:])
+
+    def decode(self, indices):
+        edge_index, corner_index = np.divmod(np.asarray(indices, dtype=np.intp), self._corner_part.size)
+        return np.concatenate((self._edge_part.decode(edge_index), self._corner_part.decode(corner_index)), axis=-1)
+
+    ## indices of compact states (single (40,) or batched (N, 40)) ##
+    def index(self, state):
+        return self.encode(np.concatenate((self._edge_part.positions(state, EP, EO),
+                                           self._corner_part.positions(state, CP, CO)), axis=-1))
+
+    ## distances of compact states (single or batched) ##
+    def lookup(self, state):
+        indices = self.index(state)
+        return (self.data[indices >> 1] >> ((indices & 1) << 2).astype(np.uint8)) & 15
+
+    __call__ = lookup
+
+    ##################
+    ## CONSTRUCTION ##
+    ##################
+
+    ## breadth-first search from the solved pattern over the 18 face turns ##
+    @classmethod
+    def build(cls, edges=(), corners=(), chunk_size=2**20, verbose=False):
+        db = cls(edges, corners)
+        edge_moves, corner_moves = cubie_transitions()
+        parts = (db._edge_part, db._corner_part)
+        tables = (db._edge_part.move_tables(edge_moves), db._corner_part.move_tables(corner_moves))
+        unseen = np.uint8(255)
+        distances = np.full(db.size, unseen, dtype=np.uint8)
+        solved = db.index(SOLVED_STATE)
+        distances[solved] = 0
+        depth, frontier = 0, np.array([solved])
+        while len(frontier):
+            if verbose: print(f"depth {depth}: {len(frontier)} patterns")
+            for start in range(0, len(frontier), chunk_size):
+                ## split the indices into arrangement and orientation of both parts ##
+                edge_index, corner_index = np.divmod(frontier[start:start + chunk_size], db._corner_part.size)
+                coords = [np.divmod(index, part.n_orientations) for index, part in zip((edge_index, corner_index), parts)]
+                for m in range(len(MOVES)):
+                    edges, corners = (part.successors(t, m, *c) for part, t, c in zip(parts, tables, coords))
+                    successors = edges * db._corner_part.size + corners
+                    distances[successors[distances[successors] == unseen]] = depth + 1
+            depth += 1
+            frontier = np.flatnonzero(distances == depth)
+        if depth > 16:
+            raise TypeError(f"Distances up to {depth - 1} do not fit in 4 bits")
+        db.data = cls.pack(distances)
+        return db
+
+    ## two 4-bit values per byte: entry 2i in the low nibble, 2i+1 in the high one ##
+    @staticmethod
+    def pack(distances):
+        distances = np.append(distances, np.uint8(0)) if len(distances) % 2 else distances
+        return (distances[0::2] | (distances[1::2] << 4)).astype(np.uint8)
+
+    def unpack(self):
+        return np.stack((self.data & 15, self.data >> 4), axis=-1).reshape(-1)[:self.size]
+
+    #############
+    ## STORAGE ##
+    #############
+
+    ## the packed table is saved as a .npy file, the tracked cubies in a .json sidecar ##
+    def save(self, path):
+        np.save(path, self.data)
+        with open(self._meta(path), 'w') as f:
+            json.dump({'edges': self.edges, 'corners': self.corners, 'size': self.size}, f)
+
+    ## with mmap=True the table is memory-mapped (read only) and shared among processes ##
+    @classmethod
+    def load(cls, path, mmap=True):
+        with open(cls._meta(path)) as f:
+            meta = json.load(f)
+        db = cls(meta['edges'], meta['corners'], np.load(path, mmap_mode='r' if mmap else None))
+        if len(db.data) != (db.size + 1) // 2:
+            raise TypeError(f"{path} holds {len(db.data)} bytes, {(db.size + 1) // 2} expected")
+        return db
+
+    @staticmethod
+    def _meta(path):
+        return os.path.splitext(str(path))[0] + '.json'
+
+
+
+
+#############
+## PRESETS ##
+#############
+
+## standard databases: all the corners and two sets of edges, either complementary ##
+## (6 + 6 edges) or overlapping on edges 5 and 6 (7 + 7 edges, larger and tighter):  ##
+## the heuristics combine them by their maximum, so they need not be disjoint        ##
+PRESETS = {'corners': {'corners': range(8)},
+           'edges6a': {'edges': range(6)},
+           'edges6b': {'edges': range(6, 12)},
+           'edges7a': {'edges': range(7)},
+           'edges7b': {'edges': range(5, 12)}}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Build a pattern database and save it as a memory-mappable .npy file")
+    parser.add_argument('preset', choices=[*PRESETS])
+    parser.add_argument('path')
+    args = parser.parse_args()
+    PatternDatabase.build(**PRESETS[args.preset], verbose=True).save(args.path)
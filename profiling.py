@@ -0,0 +1,154 @@
+###############################################################################
+# The copyright of this code, including all portions, content, design, text,  #
+# output and the selection and arrangement of the subroutines is owned by     #
+# the Authors and by CNR, unless otherwise indicated, and is protected by the #
+# provisions of the Italian Copyright law.                                    #
+#                                                                             #
+# All rights reserved. This software may not be reproduced or distributed, in #
+# whole or in part, without the prior written permission of the Authors.      #
+# However, reproduction and distribution, in whole or in part, by non-profit, #
+# research or educational institutions for their own use is permitted if      #
+# proper credit is given, with full citation, and copyright is acknowledged.  #
+# Any other reproduction or distribution, in whatever form and by whatever    #
+# media, is expressly prohibited without the prior written consent of the     #
+# Authors. For further information, please contact CNR.                       #
+# Contact person:           enrico.prati@cnr.it                               #
+#                                                                             #
+# Concept and development:  Sebastiano Corli, Lorenzo Moro, Enrico Prati      #
+# Year:                     2022                                              #
+# Istituto di Fotonica e Nanotecnologie - Consiglio Nazionale delle Ricerche  #
+###############################################################################
+
+from Rubik import *
+import baseline
+import functools
+import tracemalloc
+import time
+
+
+#############
+## TARGETS ##
+#############
+
+## Instrumented hot paths, as (class or module, function). A disabled profiler ##
+## costs nothing: the functions are wrapped when the profiler is enabled and   ##
+## restored afterwards. Cubies are built by Edge/Corner.__new__ and, in the     ##
+## integer mode, by baseline._interned (the flyweights moved by the operators) ##
+TARGETS = {'RubiksGroup.__mul__': (RubiksGroup, '__mul__'),
+           'RubiksGroup.__matmul__': (RubiksGroup, '__matmul__'),
+           'Permutations.__matmul__': (Permutations, '__matmul__'),
+           'Edge.__new__': (Edge, '__new__'),
+           'Corner.__new__': (Corner, '__new__'),
+           'baseline._interned': (baseline, '_interned')}
+_CUBIE_CONSTRUCTORS = ('Edge.__new__', 'Corner.__new__', 'baseline._interned')
+
+
+##############
+## PROFILER ##
+##############
+class Profiler:
+    ## For every target: calls, cumulative time (s, including nested calls), ##
+    ## cubies built (Edge/Corner objects allocated within the calls) and,    ##
+    ## with memory=True, net bytes allocated (traced by tracemalloc, slower)  ##
+    ## Use it as a context manager, or with enable()/disable()                ##
+    _active = None
+
+    def __init__(self, targets=None, memory=False):
+        targets = [*TARGETS] if targets is None else list(targets)
+        for name in targets:
+            if name not in TARGETS:
+                raise TypeError(f"{name} cannot be profiled: targets are {[*TARGETS]}")
+        self.targets = targets
+        self.memory = memory
+        self._originals = {}
+        self.reset()
+
+    def reset(self):
+        self.stats = {name: {'calls': 0, 'time': 0., 'cubies': 0, 'bytes': 0} for name in self.targets}
+        self._cubies = 0
+        ## depth of nested cubie constructions: only the outermost one counts a cubie ##
+        self._building = 0
+
+    @property
+    def enabled(self):
+        return Profiler._active is self
+
+    def __enter__(self):
+        self.enable()
+        return self
+
+    def __exit__(self, *exc):
+        self.disable()
+
+    def enable(self):
+        if Profiler._active is not None:
+            raise TypeError("Another Profiler is already enabled")
+        Profiler._active = self
+        self._tracing = self.memory and not tracemalloc.is_tracing()
+        if self._tracing: tracemalloc.start()
+        ## cubie constructions are counted even when the constructors are not profiled ##
+        for name in set(self.targets) | set(_CUBIE_CONSTRUCTORS):
+            owner, method = TARGETS[name]
+            original = self._originals[name] = owner.__dict__[method]
+            ## __new__ is a static method: wrap its function ##
+            if isinstance(original, staticmethod):
+                setattr(owner, method, staticmethod(self._wrap(name, original.__func__)))
+            else:
+                setattr(owner, method, self._wrap(name, original))
+        return self
+
+    def disable(self):
+        if not self.enabled: return
+        for name, original in self._originals.items():
+            owner, method = TARGETS[name]
+            setattr(owner, method, original)
+        self._originals = {}
+        if self._tracing: tracemalloc.stop()
+        Profiler._active = None
+
+    def _wrap(self, name, method):
+        stats = self.stats.get(name)
+        cubie = name in _CUBIE_CONSTRUCTORS
+
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            if cubie:
+                if not self._building: self._cubies += 1
+                self._building += 1
+            try:
+                if stats is None: return method(*args, **kwargs)
+                return self._timed(stats, method, args, kwargs, cubie)
+            finally:
+                if cubie: self._building -= 1
+        return wrapper
+
+    def _timed(self, stats, method, args, kwargs, cubie):
+        memory = self.memory
+        ## the cubie built by a constructor counts for the constructor itself ##
+        cubies = self._cubies - (cubie and self._building == 1)
+        allocated = tracemalloc.get_traced_memory()[0] if memory else 0
+        start = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            stats['time'] += time.perf_counter() - start
+            stats['calls'] += 1
+            stats['cubies'] += self._cubies - cubies
+            if memory: stats['bytes'] += tracemalloc.get_traced_memory()[0] - allocated
+
+    ## one line per target, by decreasing cumulative time ##
+    def report(self):
+        lines = [f"{'target':26s} {'calls':>10s} {'time (s)':>12s} {'us/call':>10s} {'cubies':>10s}"
+                 + (f" {'bytes':>12s}" if self.memory else '')]
+        for name, s in sorted(self.stats.items(), key=lambda item: -item[1]['time']):
+            per_call = 1e6 * s['time'] / s['calls'] if s['calls'] else 0.
+            lines.append(f"{name:26s} {s['calls']:10d} {s['time']:12.6f} {per_call:10.2f} {s['cubies']:10d}"
+                         + (f" {s['bytes']:12d}" if self.memory else ''))
+        return '\n'.join(lines)
+
+
+## profile a single call: returns (result, profiler) ##
+def profile(fn, *args, targets=None, memory=False, **kwargs):
+    with Profiler(targets, memory) as profiler:
+        result = fn(*args, **kwargs)
+    return result, profiler
@@ -0,0 +1,170 @@
+###############################################################################
+# The copyright of this code, including all portions, content, design, text,  #
+# output and the selection and arrangement of the subroutines is owned by     #
+# the Authors and by CNR, unless otherwise indicated, and is protected by the #
+# provisions of the Italian Copyright law.                                    #
+#                                                                             #
+# All rights reserved. This software may not be reproduced or distributed, in #
+# whole or in part, without the prior written permission of the Authors.      #
+# However, reproduction and distribution, in whole or in part, by non-profit, #
+# research or educational institutions for their own use is permitted if      #
+# proper credit is given, with full citation, and copyright is acknowledged.  #
+# Any other reproduction or distribution, in whatever form and by whatever    #
+# media, is expressly prohibited without the prior written consent of the     #
+# Authors. For further information, please contact CNR.                       #
+# Contact person:           enrico.prati@cnr.it                               #
+#                                                                             #
+# Concept and development:  Sebastiano Corli, Lorenzo Moro, Enrico Prati      #
+# Year:                     2022                                              #
+# Istituto di Fotonica e Nanotecnologie - Consiglio Nazionale delle Ricerche  #
+###############################################################################
+
+from Rubik import *
+from coordinates import state_keys, key_states
+from solver import state_of, ALLOWED
+import heapq
+import time
+
+
+##################
+## BATCH SEARCH ##
+##################
+
+## The searches below expand many nodes at every iteration and evaluate the ##
+## heuristic once per iteration, on the whole batch of new states: it is    ##
+## called as heuristic(encode(states)), with states a (N, 40) uint8 matrix  ##
+## of compact states (encode=None passes them unchanged, encode=one_hot     ##
+## gives the network inputs of environment.py), and returns N values.       ##
+## States are identified by their compact keys (100-bit integers)           ##
+class _BatchSearch:
+    def __init__(self, heuristic, encode=None, node_budget=None, timeout=None):
+        self.heuristic = heuristic
+        self.encode = encode
+        self.node_budget = node_budget
+        self.timeout = timeout
+        self.nodes = 0
+        self.evaluations = 0
+        self.elapsed = 0.
+
+    ## heuristic values of a batch of compact states, in a single call ##
+    def evaluate(self, states):
+        if len(states) == 0: return np.zeros(0)
+        self.evaluations += 1
+        h = self.heuristic(states if self.encode is None else self.encode(states))
+        return np.asarray(h, dtype=np.float64).reshape(len(states))
+
+    ## returns the list of move names solving the Cube, or None when no solution is   ##
+    ## found within the limits of the search, node_budget (expanded nodes) or timeout ##
+    def solve(self, cube):
+        state = state_of(cube)
+        self.nodes, self.evaluations, self._start = 0, 0, time.perf_counter()
+        try:
+            if np.array_equal(state, SOLVED_STATE): return []
+            root = state_keys(state[None])[0]
+            ## parents[key] = (parent key, last move): the root has no parent and no last move ##
+            self._parents = {root: (None, len(MOVES))}
+            return self._search(state, root)
+        finally:
+            self._parents = None
+            self.elapsed = time.perf_counter() - self._start
+
+    def _out_of_budget(self):
+        if self.node_budget is not None and self.nodes >= self.node_budget: return True
+        return self.timeout is not None and time.perf_counter() - self._start > self.timeout
+
+    ## all the children of a batch of states (pruned by their last moves), as ##
+    ## (parent indices, moves, children states, solved mask)                  ##
+    def _expand(self, states, keys):
+        self.nodes += len(keys)
+        successors, solved = RubiksGroup.successors(states)
+        parents, moves = np.nonzero(ALLOWED[[self._parents[key][1] for key in keys]])
+        return parents, moves, successors[parents, moves], solved[parents, moves]
+
+    ## moves from the root to the state of key ##
+    def _path(self, key):
+        moves = []
+        while self._parents[key][0] is not None:
+            key, move = self._parents[key]
+            moves.append(MOVES[move])
+        return moves[::-1]
+
+
+
+
+#######################
+## BATCH-WEIGHTED A* ##
+#######################
+class BatchAStarSolver(_BatchSearch):
+    ## Weighted A* popping batch_size nodes of smallest f = g + weight*h from ##
+    ## the open list (a heap of (f, g, key)) at every iteration. The closed   ##
+    ## set holds the keys of the expanded states, which are never reopened:   ##
+    ## with weight > 1 (or an inadmissible heuristic) solutions are not       ##
+    ## optimal, and the search stops at the first solved child generated      ##
+    def __init__(self, heuristic, encode=None, weight=1.0, batch_size=100, node_budget=None, timeout=None):
+        super().__init__(heuristic, encode, node_budget, timeout)
+        self.weight = weight
+        self.batch_size = batch_size
+
+    def _search(self, state, root):
+        g = {root: 0}
+        closed = set()
+        heap = [(self.weight * self.evaluate(state[None])[0], 0, root)]
+        while heap and not self._out_of_budget():
+            batch = []
+            while heap and len(batch) < self.batch_size:
+                _, depth, key = heapq.heappop(heap)
+                ## stale entries, superseded by a shorter path to the same state ##
+                if key in closed or depth > g[key]: continue
+                closed.add(key)
+                batch.append(key)
+            if not batch: break
+            parents, moves, children, solved = self._expand(key_states(batch), batch)
+            if solved.any():
+                i = np.flatnonzero(solved)[0]
+                return self._path(batch[parents[i]]) + [MOVES[moves[i]]]
+            keys, new = state_keys(children), []
+            for i, (key, parent, move) in enumerate(zip(keys, parents.tolist(), moves.tolist())):
+                depth = g[batch[parent]] + 1
+                if key in closed or g.get(key, np.inf) <= depth: continue
+                g[key] = depth
+                self._parents[key] = (batch[parent], move)
+                new.append(i)
+            for i, h in zip(new, self.evaluate(children[new]).tolist()):
+                heapq.heappush(heap, (g[keys[i]] + self.weight * h, g[keys[i]], keys[i]))
+        return None
+
+
+
+
+#################
+## BEAM SEARCH ##
+#################
+class BeamSearchSolver(_BatchSearch):
+    ## Breadth-first search keeping only the beam_width children of smallest ##
+    ## heuristic value at every depth, up to max_depth: the keys of the      ##
+    ## states that entered a beam form the closed set, so they are never     ##
+    ## expanded twice                                                        ##
+    def __init__(self, heuristic, encode=None, beam_width=1024, max_depth=30, node_budget=None, timeout=None):
+        super().__init__(heuristic, encode, node_budget, timeout)
+        self.beam_width = beam_width
+        self.max_depth = max_depth
+
+    def _search(self, state, root):
+        states, keys = state[None], [root]
+        for _ in range(self.max_depth):
+            if self._out_of_budget(): return None
+            parents, moves, children, solved = self._expand(states, keys)
+            if solved.any():
+                i = np.flatnonzero(solved)[0]
+                return self._path(keys[parents[i]]) + [MOVES[moves[i]]]
+            ## the first occurrence of every child that never entered a beam ##
+            child_keys, new = state_keys(children), {}
+            for i, key in enumerate(child_keys):
+                if key not in self._parents and key not in new: new[key] = i
+            if not new: return None
+            new = np.array(list(new.values()))
+            beam = new[np.argsort(self.evaluate(children[new]), kind='stable')[:self.beam_width]].tolist()
+            for i in beam:
+                self._parents[child_keys[i]] = (keys[parents[i]], int(moves[i]))
+            states, keys = children[beam], [child_keys[i] for i in beam]
+        return None
@@ -0,0 +1,225 @@
+###############################################################################
+# The copyright of this code, including all portions, content, design, text,  #
+# output and the selection and arrangement of the subroutines is owned by     #
+# the Authors and by CNR, unless otherwise indicated, and is protected by the #
+# provisions of the Italian Copyright law.                                    #
+#                                                                             #
+# All rights reserved. This software may not be reproduced or distributed, in #
+# whole or in part, without the prior written permission of the Authors.      #
+# However, reproduction and distribution, in whole or in part, by non-profit, #
+# research or educational institutions for their own use is permitted if      #
+# proper credit is given, with full citation, and copyright is acknowledged.  #
+# Any other reproduction or distribution, in whatever form and by whatever    #
+# media, is expressly prohibited without the prior written consent of the     #
+# Authors. For further information, please contact CNR.                       #
+# Contact person:           enrico.prati@cnr.it                               #
+#                                                                             #
+# Concept and development:  Sebastiano Corli, Lorenzo Moro, Enrico Prati      #
+# Year:                     2022                                              #
+# Istituto di Fotonica e Nanotecnologie - Consiglio Nazionale delle Ricerche  #
+###############################################################################
+
+from Rubik import *
+from coordinates import state_keys
+import time
+
+
+##################
+## MOVE PRUNING ##
+##################
+
+## Two successive turns of the same face are never needed, and turns of  ##
+## opposite faces (U-D, L-R, F-B) commute: only the order in which the    ##
+## first face of the pair comes first is kept                           ##
+MOVE_FACES = np.array([FACES.index(m[0]) for m in MOVES])
+
+
+def _allowed(last):
+    if last is None: return np.arange(len(MOVES))
+    face = MOVE_FACES[last]
+    return np.array([m for m in range(len(MOVES))
+                     if MOVE_FACES[m] != face and not (MOVE_FACES[m] == face ^ 1 and MOVE_FACES[m] < face)])
+
+
+## FOLLOWING[last] lists the moves allowed after the move last (the last row is for the first move) ##
+FOLLOWING = [_allowed(m) for m in range(len(MOVES))] + [_allowed(None)]
+## the same as a boolean (19, 18) mask ##
+ALLOWED = np.zeros((len(MOVES) + 1, len(MOVES)), dtype=bool)
+for _last, _moves in enumerate(FOLLOWING): ALLOWED[_last, _moves] = True
+## INVERSE_MOVES[m] undoes the move m (X <-> X', X2 <-> X2) ##
+INVERSE_MOVES = np.array([MOVES.index(m[0] + {'': "'", "'": '', '2': '2'}[m[1:]]) for m in MOVES])
+
+
+## compact state of a RubiksCube, CompactRubiksCube or state vector ##
+def state_of(cube):
+    if isinstance(cube, CompactRubiksCube): return cube.state
+    if isinstance(cube, RubiksCube): return cube.compact().state
+    return np.asarray(cube, dtype=np.uint8)
+
+
+## apply a sequence of move names to a copy of a compact state ##
+def apply_moves(state, moves):
+    state = state_of(state).copy()
+    for name in moves:
+        src, delta = RubiksGroup.move(name).compile()
+        state = (state[src] + delta) % MODULI
+    return state
+
+
+class _OutOfBudget(Exception):
+    pass
+
+
+
+
+#################
+## IDA* SOLVER ##
+#################
+class IDAStarSolver:
+    ## heuristics are callables mapping (N, 40) states to lower bounds of  ##
+    ## their distances, e.g. PatternDatabase objects: their maximum is used ##
+    ## With weight > 1 the search is bounded-suboptimal (f = g + weight*h) ##
+    def __init__(self, heuristics=(), weight=1.0, max_depth=26, node_budget=None, timeout=None):
+        self.heuristics = list(heuristics)
+        self.weight = weight
+        self.max_depth = max_depth
+        self.node_budget = node_budget
+        self.timeout = timeout
+        self._src, self._delta = RubiksGroup.move_tables()
+        self.nodes = 0
+        self.elapsed = 0.
+
+    def heuristic(self, states):
+        h = np.zeros(len(states), dtype=np.int64)
+        for heuristic in self.heuristics:
+            h = np.maximum(h, heuristic(states))
+        return h
+
+    ## returns the list of move names solving the Cube, or None when no solution ##
+    ## is found within max_depth, node_budget (expanded nodes) or timeout (s)   ##
+    def solve(self, cube):
+        state = state_of(cube)
+        self.nodes, self._start = 0, time.perf_counter()
+        self._path = []
+        bound = self.weight * self.heuristic(state[None])[0]
+        try:
+            while bound <= self.max_depth:
+                if np.array_equal(state, SOLVED_STATE): return []
+                t = self._search(state, 0, bound, len(MOVES))
+                if t is None:
+                    return [MOVES[m] for m in self._path]
+                ## with weight > 1 the bound grows by one at least at every iteration ##
+                bound = max(t, bound + 1)
+        except _OutOfBudget:
+            pass
+        finally:
+            self.elapsed = time.perf_counter() - self._start
+        return None
+
+    ## depth-first search below the bound: returns None when solved, ##
+    ## otherwise the smallest f exceeding the bound                    ##
+    def _search(self, state, g, bound, last):
+        moves = FOLLOWING[last]
+        children = (state[self._src[moves]] + self._delta[moves]) % MODULI
+        self.nodes += 1
+        if self.node_budget is not None and self.nodes > self.node_budget: raise _OutOfBudget
+        if self.timeout is not None and time.perf_counter() - self._start > self.timeout: raise _OutOfBudget
+        ## a solved child is accepted within the bound only: beyond it, shorter ##
+        ## solutions may still lie in the rest of the iteration              ##
+        solved = np.flatnonzero((children == SOLVED_STATE).all(axis=1))
+        if len(solved) and g + 1 <= bound:
+            self._path.append(moves[solved[0]])
+            return None
+        h = self.heuristic(children)
+        f = g + 1 + self.weight * h
+        minimum = np.inf
+        ## the most promising children first ##
+        for i in np.argsort(f, kind='stable'):
+            if f[i] > bound:
+                minimum = min(minimum, f[i])
+                continue
+            self._path.append(moves[i])
+            t = self._search(children[i], g + 1, bound, moves[i])
+            if t is None: return None
+            self._path.pop()
+            minimum = min(minimum, t)
+        return minimum
+
+
+
+
+##########################
+## BIDIRECTIONAL SOLVER ##
+##########################
+
+## one side of the bidirectional search: the states visited so far are kept ##
+## in a dict from their keys (100-bit integers) to (parent key, move, depth) ##
+class _Side:
+    def __init__(self, state):
+        self.states = state[None].copy()
+        self.keys = state_keys(self.states)
+        self.last = np.array([len(MOVES)])
+        self.depth = 0
+        self.visited = {self.keys[0]: (None, None, 0)}
+
+    ## moves from the state of key back to the root of the side ##
+    def path(self, key):
+        moves = []
+        while self.visited[key][0] is not None:
+            key, move, _ = self.visited[key]
+            moves.append(move)
+        return moves
+
+
+class BidirectionalSolver:
+    ## Meet-in-the-middle breadth-first search, from the Cube and from the     ##
+    ## solved state, always expanding the smaller frontier: the solutions are ##
+    ## optimal, for states up to max_depth moves (the visited states grow as  ##
+    ## about 13.3**(max_depth/2), i.e. some million states at depth 12)        ##
+    def __init__(self, max_depth=12):
+        self.max_depth = max_depth
+        self._src, self._delta = RubiksGroup.move_tables()
+        self.nodes = 0
+        self.elapsed = 0.
+
+    ## returns the list of move names solving the Cube, or None beyond max_depth ##
+    def solve(self, cube):
+        state = state_of(cube)
+        self.nodes, start = 0, time.perf_counter()
+        try:
+            if np.array_equal(state, SOLVED_STATE): return []
+            forward, backward = _Side(state), _Side(SOLVED_STATE)
+            while forward.depth + backward.depth < self.max_depth:
+                if len(forward.keys) <= len(backward.keys):
+                    meeting = self._expand(forward, backward)
+                else:
+                    meeting = self._expand(backward, forward)
+                if meeting is not None:
+                    moves = forward.path(meeting)[::-1] + [INVERSE_MOVES[m] for m in backward.path(meeting)]
+                    return [MOVES[m] for m in moves]
+                if len(forward.keys) == 0 or len(backward.keys) == 0: return None
+            return None
+        finally:
+            self.elapsed = time.perf_counter() - start
+
+    ## exact distance from the solved state (None beyond max_depth) ##
+    def distance(self, cube):
+        solution = self.solve(cube)
+        return None if solution is None else len(solution)
+
+    ## expand a whole level of side, returning the key of the shortest meeting with other ##
+    def _expand(self, side, other):
+        parents, moves = np.nonzero(ALLOWED[side.last])
+        children = (side.states[parents[:, None], self._src[moves]] + self._delta[moves]) % MODULI
+        self.nodes += len(side.keys)
+        side.depth += 1
+        new, keys, best, meeting = [], [], None, None
+        for i, key in enumerate(state_keys(children)):
+            if key in side.visited: continue
+            side.visited[key] = (side.keys[parents[i]], int(moves[i]), side.depth)
+            new.append(i)
+            keys.append(key)
+            if key in other.visited and (best is None or other.visited[key][2] < best):
+                best, meeting = other.visited[key][2], key
+        side.states, side.last, side.keys = children[new], moves[new], keys
+        return meeting
@@ -0,0 +1,185 @@
+###############################################################################
+# The copyright of this code, including all portions, content, design, text,  #
+# output and the selection and arrangement of the subroutines is owned by     #
+# the Authors and by CNR, unless otherwise indicated, and is protected by the #
+# provisions of the Italian Copyright law.                                    #
+#                                                                             #
+# All rights reserved. This software may not be reproduced or distributed, in #
+# whole or in part, without the prior written permission of the Authors.      #
+# However, reproduction and distribution, in whole or in part, by non-profit, #
+# research or educational institutions for their own use is permitted if      #
+# proper credit is given, with full citation, and copyright is acknowledged.  #
+# Any other reproduction or distribution, in whatever form and by whatever    #
+# media, is expressly prohibited without the prior written consent of the     #
+# Authors. For further information, please contact CNR.                       #
+# Contact person:           enrico.prati@cnr.it                               #
+#                                                                             #
+# Concept and development:  Sebastiano Corli, Lorenzo Moro, Enrico Prati      #
+# Year:                     2022                                              #
+# Istituto di Fotonica e Nanotecnologie - Consiglio Nazionale delle Ricerche  #
+###############################################################################
+
+from Rubik import *
+from coordinates import pack
+import itertools
+
+
+########################
+## SLOTS AND FACELETS ##
+########################
+
+## Centred coordinates of the 20 slots (edges, then corners), with the axes   ##
+## x: L -> R, y: D -> U, z: B -> F; every slot lies on the faces of its        ##
+## non-null coordinates, e.g. slot 0 (edge DF) has y = -1 and z = 1           ##
+SLOT_POSITIONS = np.array([[ 0, -1,  1], [-1, -1,  0], [ 0, -1, -1], [ 1, -1,  0],
+                           [ 0,  1,  1], [-1,  1,  0], [ 0,  1, -1], [ 1,  1,  0],
+                           [-1,  0,  1], [-1,  0, -1], [ 1,  0,  1], [ 1,  0, -1],
+                           [ 1, -1,  1], [-1, -1,  1], [-1, -1, -1], [ 1, -1, -1],
+                           [ 1,  1,  1], [-1,  1,  1], [-1,  1, -1], [ 1,  1, -1]])
+_SLOTS = {tuple(p): j for j, p in enumerate(SLOT_POSITIONS)}
+
+
+## The facelets of a slot are named by the axes of their normals. The first ##
+## is the reference facelet: the U/D one, or the F/B one for slice edges. A  ##
+## cubie with orientation o has its own reference facelet on the o-th facelet ##
+## of its slot; the facelets of corners are listed clockwise                  ##
+def _facelets(j):
+    axes = [a for a in range(3) if SLOT_POSITIONS[j][a]]
+    if j < 12:
+        reference = 1 if 1 in axes else 2
+        return [reference] + [a for a in axes if a != reference]
+    order = [1, 0, 2]
+    if np.linalg.det(np.eye(3)[order] * SLOT_POSITIONS[j][order, None]) > 0: order = [1, 2, 0]
+    return order
+
+
+FACELETS = [_facelets(j) for j in range(20)]
+
+
+################
+## SYMMETRIES ##
+################
+
+## The 48 symmetries of the cube are the signed permutation matrices: 24     ##
+## rotations (determinant +1) and 24 reflections (determinant -1), identity first ##
+SYMMETRIES = np.array([np.eye(3, dtype=int)[list(p)] * s[:, None] for p in itertools.permutations(range(3))
+                       for s in map(np.array, itertools.product((1, -1), repeat=3))])
+N_SYMMETRIES = 48
+REFLECTIONS = np.linalg.det(SYMMETRIES).round() < 0
+
+
+## slot images (48, 20) and facelet shifts (48, 20): the reference facelet ##
+## of the j-th slot is sent on the shift-th facelet of the image slot      ##
+def _action(matrix):
+    image, shift = np.zeros(20, dtype=np.intp), np.zeros(20, dtype=np.intp)
+    for j in range(20):
+        image[j] = _SLOTS[tuple(matrix @ SLOT_POSITIONS[j])]
+        axis = int(np.flatnonzero(matrix[:, FACELETS[j][0]])[0])
+        shift[j] = FACELETS[image[j]].index(axis)
+    return image, shift
+
+
+_IMAGES, _SHIFTS = map(np.array, zip(*map(_action, SYMMETRIES)))
+_PREIMAGES = np.argsort(_IMAGES[:, :12], axis=1), np.argsort(_IMAGES[:, 12:], axis=1)
+## composition: SYMMETRIES[_PRODUCTS[a, b]] = SYMMETRIES[a] @ SYMMETRIES[b] ##
+_MATRICES = {m.tobytes(): s for s, m in enumerate(SYMMETRIES)}
+_PRODUCTS = np.array([[_MATRICES[(a @ b).tobytes()] for b in SYMMETRIES] for a in SYMMETRIES])
+INVERSE_SYMMETRIES = np.argmin(_PRODUCTS, axis=1)
+
+
+## S * state * S^-1 for compact states (shape (..., 40)): the cubie c with   ##
+## orientation o in the slot j goes in the slot S(j) as the cubie S(c), with ##
+## orientation (+-o + shift[j] - shift[c]), - for reflections (that reverse  ##
+## the order of facelets)                                                    ##
+def conjugate(state, s):
+    state = np.asarray(state)
+    out = np.empty_like(state)
+    sign = -1 if REFLECTIONS[s] else 1
+    for perm, ori, lo, mod, preimage in [(EP, EO, 0, 2, _PREIMAGES[0][s]), (CP, CO, 12, 3, _PREIMAGES[1][s])]:
+        image, shift = _IMAGES[s, lo:lo + len(preimage)] - lo, _SHIFTS[s, lo:lo + len(preimage)]
+        cubies = state[..., perm][..., preimage].astype(np.intp)
+        orientations = state[..., ori][..., preimage].astype(np.intp)
+        out[..., perm] = image[cubies]
+        out[..., ori] = (sign * orientations + shift[preimage] - shift[cubies]) % mod
+    return out
+
+
+## SYMMETRY_MOVES[s, m]: index of the move S * m * S^-1 ##
+def _conjugate_moves():
+    src, delta = RubiksGroup.move_tables()
+    ## the image of the solved state identifies a move ##
+    images = {((SOLVED_STATE[src[m]] + delta[m]) % MODULI).tobytes(): m for m in range(len(MOVES))}
+    return np.array([[images[conjugate((SOLVED_STATE[src[m]] + delta[m]) % MODULI, s).tobytes()]
+                      for m in range(len(MOVES))] for s in range(N_SYMMETRIES)])
+
+
+SYMMETRY_MOVES = _conjugate_moves()
+
+
+## symmetry-reduced representative: the conjugate with the smallest packed key, ##
+## and the index of the symmetry giving it (states of shape (40,) or (N, 40))   ##
+def canonical(state):
+    state = np.asarray(state)
+    conjugates = np.stack([conjugate(state, s) for s in range(N_SYMMETRIES)])
+    words = pack(conjugates)
+    best = np.lexsort((words[..., 0], words[..., 1]), axis=0)[0]
+    return np.take_along_axis(conjugates, best[None, ..., None], axis=0)[0], best
+
+
+
+
+########################
+## SYMMETRY OPERATORS ##
+########################
+class Symmetry:
+    ## the index-th of SYMMETRIES, acting by conjugation on Cubes and operators ##
+    def __init__(self, index=0):
+        self.index = int(index)
+        self.matrix = SYMMETRIES[self.index]
+
+    @classmethod
+    def all(cls):
+        return [cls(s) for s in range(N_SYMMETRIES)]
+
+    def __repr__(self):
+        return f"Symmetry({self.index})"
+
+    def __eq__(self, other):
+        return isinstance(other, Symmetry) and self.index == other.index
+
+    def __hash__(self):
+        return self.index
+
+    def is_reflection(self):
+        return bool(REFLECTIONS[self.index])
+
+    def __matmul__(self, other):
+        return Symmetry(_PRODUCTS[self.index, other.index])
+
+    def inverse(self):
+        return Symmetry(INVERSE_SYMMETRIES[self.index])
+
+    ## S * Cube * S^-1, a new Cube of the same type ##
+    def __mul__(self, Cube):
+        if isinstance(Cube, RubiksCube):
+            return CompactRubiksCube(conjugate(Cube.compact().state, self.index)).to_cube()
+        if isinstance(Cube, CompactRubiksCube):
+            return CompactRubiksCube(conjugate(Cube.state, self.index))
+        if isinstance(Cube, BatchedRubiksCube):
+            return BatchedRubiksCube(state_matrix=conjugate(Cube.state, self.index))
+        raise TypeError(f"Cannot apply a symmetry to {type(Cube).__name__}")
+
+    ## S * operator * S^-1, e.g. R -> L' under the left-right reflection ##
+    def conjugate(self, operator):
+        if not isinstance(operator, RubiksGroup):
+            raise TypeError(f"Cannot conjugate {type(operator).__name__}")
+        image = conjugate((SOLVED_STATE[operator.compile()[0]] + operator.compile()[1]) % MODULI, self.index)
+        src = np.concatenate((image[EP], 12 + image[EP], 24 + image[CP], 32 + image[CP])).astype(np.intp)
+        delta = np.concatenate((np.zeros(12), image[EO], np.zeros(8), image[CO])).astype(np.uint8)
+        return RubiksGroup.from_table((src, delta))
+
+    ## name of the conjugated move ##
+    def move(self, name):
+        if name not in MOVES:
+            raise TypeError(f"Unknown move {name}")
+        return MOVES[SYMMETRY_MOVES[self.index, MOVES.index(name)]]
@@ -0,0 +1,297 @@
+###############################################################################
+# The copyright of this code, including all portions, content, design, text,  #
+# output and the selection and arrangement of the subroutines is owned by     #
+# the Authors and by CNR, unless otherwise indicated, and is protected by the #
+# provisions of the Italian Copyright law.                                    #
+#                                                                             #
+# All rights reserved. This software may not be reproduced or distributed, in #
+# whole or in part, without the prior written permission of the Authors.      #
+# However, reproduction and distribution, in whole or in part, by non-profit, #
+# research or educational institutions for their own use is permitted if      #
+# proper credit is given, with full citation, and copyright is acknowledged.  #
+# Any other reproduction or distribution, in whatever form and by whatever    #
+# media, is expressly prohibited without the prior written consent of the     #
+# Authors. For further information, please contact CNR.                       #
+# Contact person:           enrico.prati@cnr.it                               #
+#                                                                             #
+# Concept and development:  Sebastiano Corli, Lorenzo Moro, Enrico Prati      #
+# Year:                     2022                                              #
+# Istituto di Fotonica e Nanotecnologie - Consiglio Nazionale delle Ricerche  #
+###############################################################################
+
+from Rubik import *
+from coordinates import rank_permutation, unrank_permutation, unrank_orientation, \
+    corner_twist_coord, edge_flip_coord, corner_permutation_coord
+from solver import FOLLOWING, state_of, apply_moves
+from math import comb
+import multiprocessing as mp
+import itertools
+import time
+import os
+
+
+## Two-phase algorithm (H. Kociemba): phase 1 brings the Cube into the subgroup  ##
+## G1 = <U, D, R2, L2, F2, B2> (null twists and flips, UD-slice edges in the     ##
+## slice), phase 2 solves it within G1. Both phases are IDA* searches on small   ##
+## coordinates, driven by move tables and exact pruning tables on pairs of them. ##
+
+## edges 8, 9, 10, 11 are those of the UD slice (between the U and D layers) ##
+SLICE_EDGES = [8, 9, 10, 11]
+## moves of G1, as indices in MOVES ##
+PHASE2_MOVES = [MOVES.index(m) for m in ['U', "U'", 'U2', 'D', "D'", 'D2', 'R2', 'L2', 'F2', 'B2']]
+
+
+#################
+## COORDINATES ##
+#################
+
+## phase 1: corner twists (2187), edge flips (2048) and slots of the UD-slice edges (C(12,4) = 495) ##
+twist_coord = corner_twist_coord
+flip_coord = edge_flip_coord
+
+
+## combinatorial number system on the (sorted) slots holding the slice edges ##
+def slice_coord(state):
+    slots = np.sort(np.argsort(np.asarray(state)[..., EP], axis=-1)[..., SLICE_EDGES], axis=-1)
+    return sum(_COMB[slots[..., i], i + 1] for i in range(4))
+
+
+## phase 2: corner permutation (8!), permutation of the U and D layer edges (8!) and of the slice edges (4!) ##
+corner_coord = corner_permutation_coord
+
+
+def ud_edges_coord(state):
+    return rank_permutation(np.asarray(state)[..., EP][..., :8])
+
+
+def slice_permutation_coord(state):
+    return rank_permutation(np.asarray(state)[..., EP][..., 8:] - 8)
+
+
+_COMB = np.array([[comb(n, k) for k in range(5)] for n in range(12)], dtype=np.int64)
+SLICE_GOAL = int(slice_coord(SOLVED_STATE))
+
+
+## representative states: the r-th row has coordinate r (other cubies solved) ##
+def _twist_states():
+    states = np.tile(SOLVED_STATE, (3**7, 1))
+    states[:, CO] = unrank_orientation(np.arange(3**7), 8, 3)
+    return states
+
+
+def _flip_states():
+    states = np.tile(SOLVED_STATE, (2**11, 1))
+    states[:, EO] = unrank_orientation(np.arange(2**11), 12, 2)
+    return states
+
+
+def _slice_states():
+    states = np.tile(SOLVED_STATE, (comb(12, 4), 1))
+    for slots in map(list, itertools.combinations(range(12), 4)):
+        others = [j for j in range(12) if j not in slots]
+        ep = np.empty(12, dtype=np.uint8)
+        ep[slots], ep[others] = SLICE_EDGES, range(8)
+        state = SOLVED_STATE.copy()
+        state[EP] = ep
+        states[slice_coord(state)] = state
+    return states
+
+
+def _corner_states():
+    states = np.tile(SOLVED_STATE, (40320, 1))
+    states[:, CP] = unrank_permutation(np.arange(40320), 8)
+    return states
+
+
+def _ud_edges_states():
+    states = np.tile(SOLVED_STATE, (40320, 1))
+    states[:, 0:8] = unrank_permutation(np.arange(40320), 8)
+    return states
+
+
+def _slice_permutation_states():
+    states = np.tile(SOLVED_STATE, (24, 1))
+    states[:, 8:12] = 8 + unrank_permutation(np.arange(24), 4)
+    return states
+
+
+############
+## TABLES ##
+############
+
+## move table: table[r, i] is the coordinate reached from r by the i-th of moves ##
+def move_table(states, coord, moves):
+    src, delta = RubiksGroup.move_tables()
+    return np.stack([coord((states[:, src[m]] + delta[m]) % MODULI) for m in moves], axis=1).astype(np.int32)
+
+
+## exact distances on the pair (a, b) of coordinates, index a * len(table_b) + b ##
+def pruning_table(table_a, table_b, goal_a, goal_b):
+    nb = len(table_b)
+    distances = np.full(len(table_a) * nb, 255, dtype=np.uint8)
+    distances[goal_a * nb + goal_b] = 0
+    depth, frontier = 0, np.array([goal_a * nb + goal_b])
+    while len(frontier):
+        a, b = np.divmod(frontier, nb)
+        for i in range(table_a.shape[1]):
+            successors = table_a[a, i].astype(np.int64) * nb + table_b[b, i]
+            distances[successors[distances[successors] == 255]] = depth + 1
+        depth += 1
+        frontier = np.flatnonzero(distances == depth)
+    return distances
+
+
+def build_tables():
+    twist, flip, slc = (move_table(f(), c, range(len(MOVES))) for f, c in
+                        [(_twist_states, twist_coord), (_flip_states, flip_coord), (_slice_states, slice_coord)])
+    corners, ud_edges, slice_perm = (move_table(f(), c, PHASE2_MOVES) for f, c in
+                                     [(_corner_states, corner_coord), (_ud_edges_states, ud_edges_coord),
+                                      (_slice_permutation_states, slice_permutation_coord)])
+    return {'twist': twist, 'flip': flip, 'slice': slc,
+            'corners': corners, 'ud_edges': ud_edges, 'slice_perm': slice_perm,
+            'slice_twist_prune': pruning_table(slc, twist, SLICE_GOAL, 0),
+            'slice_flip_prune': pruning_table(slc, flip, SLICE_GOAL, 0),
+            'corners_prune': pruning_table(corners, slice_perm, 0, 0),
+            'ud_edges_prune': pruning_table(ud_edges, slice_perm, 0, 0)}
+
+
+## the tables are built once per process, or loaded from (and saved to) an .npz file ##
+_TABLES = None
+
+
+def tables(path=None):
+    global _TABLES
+    if _TABLES is None:
+        if path is not None and os.path.exists(path):
+            with np.load(path) as f: _TABLES = dict(f)
+        else:
+            _TABLES = build_tables()
+            if path is not None: np.savez(path, **_TABLES)
+    return _TABLES
+
+
+class _Done(Exception):
+    pass
+
+
+######################
+## TWO-PHASE SOLVER ##
+######################
+class TwoPhaseSolver:
+    ## The search goes on with longer phase-1 solutions, keeping the shortest  ##
+    ## total, until a solution of target_length moves at most is found or the  ##
+    ## timeout (s) expires; in the latter case the best solution is returned   ##
+    ## (the search continues up to the first solution if none was found yet). ##
+    ## Phase 2 is limited to max_phase2 moves, so that phase 1 moves on to    ##
+    ## other solutions instead of searching long phase-2 continuations.       ##
+    ## Throughput (pure python, one core): random states are solved in about  ##
+    ## 80 ms median (350 ms at p90) with 22 moves at most, 21 on average, i.e. ##
+    ## some 7 states/s per process; use solve_batch with processes to scale   ##
+    def __init__(self, target_length=22, timeout=1.0, max_length=30, max_phase2=11, tables_path=None):
+        self.target_length = target_length
+        self.timeout = timeout
+        self.max_length = max_length
+        self.max_phase2 = max_phase2
+        self.elapsed = 0.
+        self.tables_path = tables_path
+        t = tables(tables_path)
+        ## python lists: scalar indexing is much faster than on numpy arrays ##
+        self._twist, self._flip, self._slice = t['twist'].tolist(), t['flip'].tolist(), t['slice'].tolist()
+        self._corners, self._ud_edges, self._slice_perm = t['corners'].tolist(), t['ud_edges'].tolist(), t['slice_perm'].tolist()
+        self._slice_twist, self._slice_flip = t['slice_twist_prune'].tobytes(), t['slice_flip_prune'].tobytes()
+        self._corners_prune, self._ud_edges_prune = t['corners_prune'].tobytes(), t['ud_edges_prune'].tobytes()
+        self._following1 = [list(f) for f in FOLLOWING]
+        self._following2 = [[i for i, m in enumerate(PHASE2_MOVES) if m in f] for f in FOLLOWING]
+        self._g1 = set(PHASE2_MOVES)
+
+    def _h1(self, twist, flip, slc):
+        return max(self._slice_twist[slc * 2187 + twist], self._slice_flip[slc * 2048 + flip])
+
+    ## returns the list of move names solving the Cube ##
+    def solve(self, cube):
+        self._state = state_of(cube)
+        self._start, self._best, self._limit, self._nodes = time.perf_counter(), None, self.max_length, 0
+        twist, flip, slc = int(twist_coord(self._state)), int(flip_coord(self._state)), int(slice_coord(self._state))
+        try:
+            if np.array_equal(self._state, SOLVED_STATE): return []
+            for depth in range(self._h1(twist, flip, slc), self.max_length + 1):
+                if depth >= self._limit: break
+                self._phase1(twist, flip, slc, depth, len(MOVES), [])
+        except _Done:
+            pass
+        finally:
+            self.elapsed = time.perf_counter() - self._start
+        return None if self._best is None else [MOVES[m] for m in self._best]
+
+    ## all the phase-1 solutions of exactly depth moves are passed to phase 2 ##
+    def _phase1(self, twist, flip, slc, depth, last, moves):
+        ## the timeout is checked at every node once a solution exists ##
+        if self._best is not None and time.perf_counter() - self._start > self.timeout: raise _Done
+        if depth == 0:
+            ## a phase-1 solution ending with a move of G1 was already found shorter ##
+            if not moves or last not in self._g1: self._start_phase2(moves)
+            return
+        ## the heuristic is inlined: this loop is the hot path of phase 1 ##
+        twist_moves, flip_moves, slice_moves = self._twist[twist], self._flip[flip], self._slice[slc]
+        slice_twist, slice_flip = self._slice_twist, self._slice_flip
+        for m in self._following1[last]:
+            t, f, s = twist_moves[m], flip_moves[m], slice_moves[m]
+            if slice_twist[s * 2187 + t] < depth and slice_flip[s * 2048 + f] < depth:
+                moves.append(m)
+                self._phase1(t, f, s, depth - 1, m, moves)
+                moves.pop()
+
+    def _start_phase2(self, moves1):
+        state = apply_moves(self._state, [MOVES[m] for m in moves1])
+        corners, ud, sp = int(corner_coord(state)), int(ud_edges_coord(state)), int(slice_permutation_coord(state))
+        h = max(self._corners_prune[corners * 24 + sp], self._ud_edges_prune[ud * 24 + sp])
+        last = moves1[-1] if moves1 else len(MOVES)
+        for depth in range(h, min(self._limit - len(moves1), self.max_phase2 + 1)):
+            moves2 = []
+            if self._phase2(corners, ud, sp, depth, last, moves2):
+                self._best = moves1 + moves2
+                self._limit = len(self._best)
+                break
+        if self._best is not None and (len(self._best) <= self.target_length or
+                                       time.perf_counter() - self._start > self.timeout):
+            raise _Done
+
+    def _phase2(self, corners, ud, sp, depth, last, moves):
+        ## the timeout is checked every 1024 nodes once a solution exists ##
+        self._nodes += 1
+        if not self._nodes & 1023 and self._best is not None and time.perf_counter() - self._start > self.timeout:
+            raise _Done
+        if depth == 0:
+            return corners == 0 and ud == 0 and sp == 0
+        depth -= 1
+        corners_moves, ud_moves, sp_moves = self._corners[corners], self._ud_edges[ud], self._slice_perm[sp]
+        for i in self._following2[last]:
+            c, u, s = corners_moves[i], ud_moves[i], sp_moves[i]
+            if self._corners_prune[c * 24 + s] <= depth and self._ud_edges_prune[u * 24 + s] <= depth:
+                moves.append(PHASE2_MOVES[i])
+                if self._phase2(c, u, s, depth, PHASE2_MOVES[i], moves): return True
+                moves.pop()
+        return False
+
+    ## solve many Cubes, optionally in a pool of processes (the tables are built, or ##
+    ## loaded from tables_path, once per process)                                   ##
+    def solve_batch(self, cubes, processes=None):
+        states = [state_of(cube) for cube in cubes]
+        if processes is None or processes <= 1:
+            return [self.solve(state) for state in states]
+        settings = (self.target_length, self.timeout, self.max_length, self.max_phase2, self.tables_path)
+        with mp.get_context().Pool(processes, initializer=_init_worker, initargs=settings) as pool:
+            return pool.map(_solve_worker, states)
+
+
+## workers of solve_batch ##
+_WORKER = None
+
+
+def _init_worker(*settings):
+    global _WORKER
+    _WORKER = TwoPhaseSolver(*settings)
+
+
+def _solve_worker(state):
+    return _WORKER.solve(state)
@@ -0,0 +1,218 @@
+###############################################################################
+# The copyright of this code, including all portions, content, design, text,  #
+# output and the selection and arrangement of the subroutines is owned by     #
+# the Authors and by CNR, unless otherwise indicated, and is protected by the #
+# provisions of the Italian Copyright law.                                    #
+#                                                                             #
+# All rights reserved. This software may not be reproduced or distributed, in #
+# whole or in part, without the prior written permission of the Authors.      #
+# However, reproduction and distribution, in whole or in part, by non-profit, #
+# research or educational institutions for their own use is permitted if      #
+# proper credit is given, with full citation, and copyright is acknowledged.  #
+# Any other reproduction or distribution, in whatever form and by whatever    #
+# media, is expressly prohibited without the prior written consent of the     #
+# Authors. For further information, please contact CNR.                       #
+# Contact person:           enrico.prati@cnr.it                               #
+#                                                                             #
+# Concept and development:  Sebastiano Corli, Lorenzo Moro, Enrico Prati      #
+# Year:                     2022                                              #
+# Istituto di Fotonica e Nanotecnologie - Consiglio Nazionale delle Ricerche  #
+###############################################################################
+
+from environment import *
+import multiprocessing as mp
+from multiprocessing import shared_memory
+
+
+########################################
+## VECTOR ENVIRONMENT (single process) ##
+########################################
+class VectorRubiksEnv:
+    ## n_envs environments stepped together on a BatchedRubiksCube.         ##
+    ## Finished environments are reset (and scrambled) automatically, so    ##
+    ## the observation returned for them is the first one of a new episode. ##
+    ## Observations are written in place in out (allocated when None).      ##
+    def __init__(self, n_envs, n_actions=12, scramble_depth=20, max_steps=100, solved_reward=1.0, step_reward=0.0,
+                 obs_dtype=np.float32, out=None, macros=()):
+        if n_actions not in ACTION_SETS:
+            raise TypeError(f"n_actions must be one of {[*ACTION_SETS]}, not {n_actions}")
+        ## face turns, then macros, as in RubiksEnv ##
+        self.n_turns = n_actions
+        self.actions = ACTION_SETS[n_actions] + macro_names(macros)
+        self._tables = self._src, self._delta = RubiksGroup.action_tables(self.actions)
+        self.scramble_depth = scramble_depth
+        self.max_steps = max_steps
+        self.solved_reward = solved_reward
+        self.step_reward = step_reward
+        self.cubes = BatchedRubiksCube(n_envs)
+        self.steps = np.zeros(n_envs, dtype=np.int64)
+        self.np_random = np.random.default_rng()
+        self.obs = np.zeros((n_envs, ONE_HOT_SIZE), dtype=obs_dtype) if out is None else out
+        if self.obs.shape != (n_envs, ONE_HOT_SIZE):
+            raise TypeError(f"Observation buffer must have shape ({n_envs}, {ONE_HOT_SIZE}), not {self.obs.shape}")
+        self.obs[...] = 0
+        self._hot = one_hot_indices(self.cubes.state)
+        np.put_along_axis(self.obs, self._hot, 1, axis=1)
+
+    def __len__(self):
+        return len(self.cubes)
+
+    ## rewrite only the entries of the buffer that change ##
+    def _observe(self):
+        np.put_along_axis(self.obs, self._hot, 0, axis=1)
+        self._hot = one_hot_indices(self.cubes.state)
+        np.put_along_axis(self.obs, self._hot, 1, axis=1)
+        return self.obs
+
+    ## reset and scramble the environments selected by the indices in rows ##
+    def _restart(self, rows):
+        depth = self.scramble_depth
+        if np.ndim(depth) == 0:
+            depths = np.full(len(rows), depth)
+        else:
+            depths = self.np_random.integers(depth[0], depth[1] + 1, size=len(rows))
+        states = np.tile(SOLVED_STATE, (len(rows), 1))
+        ## every Cube receives its own number of random face turns ##
+        for d in range(depths.max(initial=0)):
+            active = np.flatnonzero(depths > d)
+            a = self.np_random.integers(self.n_turns, size=len(active))
+            states[active] = (states[active[:, None], self._src[a]] + self._delta[a]) % MODULI
+        self.cubes.state[rows] = states
+        self.steps[rows] = 0
+
+    def reset(self, seed=None):
+        if seed is not None:
+            self.np_random = np.random.default_rng(seed)
+        self._restart(np.arange(len(self)))
+        return self._observe(), {}
+
+    ## returns observations, rewards, terminated, truncated, info (arrays over the environments) ##
+    def step(self, actions):
+        self.cubes.step(actions, self._tables)
+        self.steps += 1
+        terminated = self.cubes.is_solved()
+        truncated = ~terminated & (self.steps >= self.max_steps)
+        rewards = np.where(terminated, self.solved_reward, self.step_reward).astype(np.float32)
+        done = np.flatnonzero(terminated | truncated)
+        if len(done):
+            self._restart(done)
+        return self._observe(), rewards, terminated, truncated, {}
+
+
+
+
+#######################################
+## VECTOR ENVIRONMENT (process pool) ##
+#######################################
+
+## attach to a shared memory block and view it as a numpy array ##
+def _attach(name, shape, dtype):
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+
+## loop run by every worker: it steps the environments lo:hi of the pool ##
+def _worker(conn, buffers, lo, hi, kwargs):
+    blocks, views = zip(*(_attach(*b) for b in buffers))
+    obs, actions, rewards, terminated, truncated = views
+    env = VectorRubiksEnv(hi - lo, out=obs[lo:hi], **kwargs)
+    try:
+        while True:
+            command, arg = conn.recv()
+            if command == 'step':
+                _, rewards[lo:hi], terminated[lo:hi], truncated[lo:hi], _ = env.step(actions[lo:hi])
+            elif command == 'reset':
+                env.reset(seed=arg)
+            elif command == 'close':
+                break
+            conn.send(None)
+    finally:
+        ## the numpy views must be released before closing the blocks ##
+        del env, obs, actions, rewards, terminated, truncated, views
+        for shm in blocks: shm.close()
+        conn.close()
+
+
+class SubprocVectorRubiksEnv:
+    ## n_envs environments split among n_workers processes. Observations, ##
+    ## actions, rewards and flags live in shared memory: the arrays       ##
+    ## returned by reset() and step() are views on it (no copy), and are  ##
+    ## overwritten by the next call.                                      ##
+    def __init__(self, n_envs, n_workers=None, obs_dtype=np.float32, context=None, **kwargs):
+        n_workers = min(n_envs, n_workers or mp.cpu_count())
+        self.n_envs = n_envs
+        self.n_workers = n_workers
+        ## the macros are sent to the workers as operators, so they need not be registered there ##
+        if 'macros' in kwargs:
+            kwargs['macros'] = {name: RubiksGroup.macro(name) for name in macro_names(kwargs['macros'])}
+        self.actions = ACTION_SETS[kwargs.get('n_actions', 12)] + [*kwargs.get('macros', {})]
+        specs = [((n_envs, ONE_HOT_SIZE), obs_dtype), ((n_envs,), np.int64), ((n_envs,), np.float32),
+                 ((n_envs,), np.bool_), ((n_envs,), np.bool_)]
+        self._blocks, views = [], []
+        for shape, dtype in specs:
+            size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+            shm = shared_memory.SharedMemory(create=True, size=size)
+            self._blocks.append(shm)
+            views.append(np.ndarray(shape, dtype=dtype, buffer=shm.buf))
+        self.obs, self._actions, self.rewards, self.terminated, self.truncated = views
+        buffers = [(shm.name, shape, dtype) for shm, (shape, dtype) in zip(self._blocks, specs)]
+        ## contiguous sub-batches of (almost) equal size ##
+        bounds = np.linspace(0, n_envs, n_workers + 1).astype(int)
+        ctx = mp.get_context(context)
+        self._conns, self._processes = [], []
+        for lo, hi in zip(bounds[:-1], bounds[1:]):
+            parent, child = ctx.Pipe()
+            process = ctx.Process(target=_worker, args=(child, buffers, lo, hi, dict(kwargs, obs_dtype=obs_dtype)),
+                                  daemon=True)
+            process.start()
+            child.close()
+            self._conns.append(parent)
+            self._processes.append(process)
+        self.closed = False
+
+    def __len__(self):
+        return self.n_envs
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    ## send the same command to all the workers and wait for them ##
+    def _broadcast(self, commands):
+        for conn, command in zip(self._conns, commands):
+            conn.send(command)
+        for conn in self._conns:
+            conn.recv()
+
+    def reset(self, seed=None):
+        seeds = [None] * self.n_workers if seed is None else \
+            [int(s.generate_state(1)[0]) for s in np.random.SeedSequence(seed).spawn(self.n_workers)]
+        self._broadcast([('reset', s) for s in seeds])
+        return self.obs, {}
+
+    ## returns observations, rewards, terminated, truncated, info, as views on shared memory ##
+    def step(self, actions):
+        self._actions[:] = actions
+        self._broadcast([('step', None)] * self.n_workers)
+        return self.obs, self.rewards, self.terminated, self.truncated, {}
+
+    def close(self):
+        if self.closed:
+            return
+        for conn in self._conns:
+            conn.send(('close', None))
+        for process in self._processes:
+            process.join()
+        for conn in self._conns:
+            conn.close()
+        del self.obs, self._actions, self.rewards, self.terminated, self.truncated
+        for shm in self._blocks:
+            ## views still held by the caller keep the mapping alive until they are released ##
+            try:
+                shm.close()
+            except BufferError:
+                pass
+            shm.unlink()
+        self.closed = True